@@ -1,6 +1,14 @@
+from numpy.testing import \
+    assert_array_equal, \
+    assert_raises
+
 from ytree.frontends.ahf import \
     AHFArbor, \
     AHFNewArbor
+from ytree.frontends.ahf.misc import \
+    _get_text_lines, \
+    parse_AHF_crm, \
+    parse_AHF_mtree
 from ytree.utilities.testing import \
     ArborTest, \
     TempDirTest
@@ -16,3 +24,57 @@ class AHFNewArborTest(TempDirTest, ArborTest):
     test_filename = "AHF_100_tiny/GIZMO-NewMDCLUSTER_0047.snap_128.parameter"
     num_data_files = 5
     tree_skip = 100
+
+class AHFParserTest(TempDirTest):
+    def test_parse_mtree(self):
+        with open("test_mtree", mode="w") as f:
+            f.write("# header\n"
+                    "100  50\n"
+                    "  40  7  45\n"
+                    "  \t5 8  9\n"
+                    "101 20\n"
+                    "102 30\n"
+                    "  30 9 31")
+        data = parse_AHF_mtree("test_mtree")
+        assert_array_equal(data["shared"], [40, 5, 30])
+        assert_array_equal(data["prog_id"], [7, 8, 9])
+        assert_array_equal(data["prog_part"], [45, 9, 31])
+        assert_array_equal(data["desc_id"], [100, 100, 102])
+        assert_array_equal(data["desc_part"], [50, 50, 30])
+
+        # token counts do not depend on the block size
+        lines = _get_text_lines("test_mtree")
+        assert_array_equal(lines[3], [2, 2, 3, 3, 2, 2, 3])
+        for block_size in [1, 2, 5]:
+            for arr1, arr2 in zip(
+                    lines, _get_text_lines("test_mtree", block_size)):
+                assert_array_equal(arr1, arr2)
+
+        # progenitors with no descendent
+        with open("test_mtree", mode="w") as f:
+            f.write("  40 7 45\n"
+                    "100 50\n")
+        assert_raises(RuntimeError, parse_AHF_mtree, "test_mtree")
+
+    def test_parse_crm(self):
+        with open("test_crm", mode="w") as f:
+            f.write("header 1\nheader 2\nheader 3\n"
+                    "100 2\n"
+                    "7 40 0.5 0.1\n"
+                    "8 5 0.2 0.1\n"
+                    "101 0\n"
+                    "102 1\n"
+                    "9 30 0.9 0.8\n"
+                    "END\n"
+                    "10 1 0.1 0.1\n")
+        ids, descids = parse_AHF_crm("test_crm")
+        assert_array_equal(ids, [7, 8, 9])
+        assert_array_equal(descids, [100, 100, 102])
+
+        with open("test_crm", mode="w") as f:
+            f.write("header 1\nheader 2\nheader 3\n"
+                    "7 40 0.5 0.1\n"
+                    "100 1\n"
+                    "8 5 0.2 0.1\n"
+                    "END\n")
+        assert_raises(RuntimeError, parse_AHF_crm, "test_crm")
@@ -1,5 +1,14 @@
+import h5py
+from numpy.testing import \
+    assert_equal
+import numpy as np
+
 from ytree.frontends.consistent_trees_hdf5 import \
     ConsistentTreesHDF5Arbor
+from ytree.frontends.consistent_trees_hdf5.io import \
+    ChunkStore
+from ytree.utilities.io import \
+    read_hdf5_rows
 from ytree.utilities.testing import \
     ArborTest, \
     TempDirTest
@@ -30,3 +39,66 @@ class ConsistentTreesHDF5ArborTest4(TempDirTest, ArborTest):
                      "consistent_trees_hdf5/soa/forest_0.h5"]
     num_data_files = 2
     tree_skip = 20000
+
+class ConsistentTreesHDF5ReadRowsTest(TempDirTest):
+    def test_read_hdf5_rows(self):
+        data = np.arange(1000, dtype=np.float32)
+        vdata = np.arange(3000).reshape(1000, 3)
+        with h5py.File("rows.h5", mode="w") as f:
+            f.create_dataset("soa", data=data, chunks=(64,))
+            f.create_dataset("aos", data=data.astype([("x", np.float32)]))
+            f.create_dataset("vec", data=vdata)
+
+        indices = np.array([999, 0, 500, 3, 3, 64, 65, 10])
+        with h5py.File("rows.h5", mode="r") as f:
+            for max_gap, max_rows in [(0, 1), (10, 100), (4096, 262144)]:
+                rows = read_hdf5_rows(f["soa"], indices,
+                                      max_gap=max_gap, max_rows=max_rows)
+                assert_equal(rows, data[indices])
+                rows = read_hdf5_rows(f["aos"], indices,
+                                      max_gap=max_gap, max_rows=max_rows)
+                assert_equal(rows["x"], data[indices])
+            assert_equal(read_hdf5_rows(f["soa"], []).size, 0)
+            assert_equal(read_hdf5_rows(f["vec"], indices, max_gap=10),
+                         vdata[indices])
+
+class ConsistentTreesHDF5ChunkStoreTest(TempDirTest):
+    def test_chunk_store(self):
+        rng = np.random.default_rng(1066)
+        nhalos = 1000
+        data = {"Mvir": rng.random(nhalos).astype(np.float32),
+                "id": np.arange(nhalos, dtype=np.int64)}
+        aos_data = np.empty(nhalos, dtype=[(field, val.dtype)
+                                           for field, val in data.items()])
+        for field, val in data.items():
+            aos_data[field] = val
+        with h5py.File("forest.h5", mode="w") as f:
+            for chunks in [(64,), None]:
+                g = f.create_group(f"soa_{chunks is None}")
+                for field, val in data.items():
+                    g.create_dataset(field, data=val, chunks=chunks)
+                f.create_dataset(f"aos_{chunks is None}",
+                                 data=aos_data, chunks=chunks)
+
+        with h5py.File("forest.h5", mode="r") as f:
+            for chunk_size, max_size in \
+              [(1, 1), (7, 500), (50, 3000), (100, 10**6)]:
+                store = ChunkStore(chunk_size=chunk_size, max_size=max_size)
+                # mostly sequential ranges, as when reading trees in
+                # order, followed by random ones
+                starts = np.sort(rng.integers(0, nhalos, 100))
+                ranges = [(start, min(nhalos, start + rng.integers(0, 200)))
+                          for start in starts]
+                ranges += [(start, start + rng.integers(0, nhalos - start))
+                           for start in rng.integers(0, nhalos, 50)]
+                for start, end in ranges:
+                    for name in f:
+                        for field, val in data.items():
+                            rdata = store.get(f[name], field, (start, end))
+                            assert_equal(rdata, val[start:end])
+                            # changing the copy does not change the store
+                            rdata[:] = 0
+                        assert store.size <= max_size
+                        assert_equal(
+                            store.size,
+                            sum(entry[1] for entry in store.data.values()))
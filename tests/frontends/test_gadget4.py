@@ -1,5 +1,13 @@
+import h5py
+from numpy.testing import \
+    assert_equal
+import numpy as np
+from types import SimpleNamespace
+
 from ytree.frontends.gadget4 import \
     Gadget4Arbor
+from ytree.frontends.gadget4.io import \
+    Gadget4TreeStore
 from ytree.utilities.testing import \
     ArborTest, \
     TempDirTest
@@ -17,3 +25,37 @@ class Gadget4ArborMultipleTest(TempDirTest, ArborTest):
     groups = ("forest", "tree", "prog")
     num_data_files = 64
     tree_skip = 100
+
+class Gadget4TreeStoreTest(TempDirTest):
+    def test_tree_store(self):
+        rng = np.random.default_rng(1492)
+        sizes = rng.integers(1, 40, size=50)
+        ends = sizes.cumsum()
+        starts = ends - sizes
+        nhalos = ends[-1]
+        data = {"SubhaloMass": rng.random(nhalos).astype(np.float32),
+                "SubhaloPos": rng.random((nhalos, 3))}
+        with h5py.File("trees.hdf5", mode="w") as f:
+            g = f.create_group("TreeHalos")
+            for field, val in data.items():
+                g.create_dataset(field, data=val)
+
+        with h5py.File("trees.hdf5", mode="r") as f:
+            data_file = SimpleNamespace(fh=f)
+            # every other tree, so that the store does not hold all
+            sel = np.arange(0, sizes.size, 2)
+            for chunk_size in [1, 17, 100, nhalos]:
+                store = Gadget4TreeStore(
+                    data_file, starts[sel], ends[sel],
+                    chunk_size=chunk_size)
+                assert starts[1] not in store
+                order = np.concatenate([sel, rng.permutation(sel)])
+                for i in order:
+                    assert starts[i] in store
+                    for field, val in data.items():
+                        assert_equal(
+                            store.get_field(field, starts[i]),
+                            val[starts[i]:ends[i]])
+                        assert_equal(
+                            store.get_field(field, starts[i], root_only=True),
+                            val[starts[i]:starts[i]+1])
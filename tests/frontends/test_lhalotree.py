@@ -136,6 +136,30 @@ def test_LHaloTreeReader():
     # fd.close()
 
 
+@requires_file(SMT)
+def test_LHaloTreeReader_batch():
+    reader = lhtutils.LHaloTreeReader(SMT)
+    trees = [reader.read_single_tree(i) for i in range(reader.ntrees)]
+    data = reader.read_tree_range(0, reader.ntrees)
+    for k in reader.fields:
+        np.testing.assert_array_equal(
+            data[k], np.concatenate([tree[k] for tree in trees]))
+    # small chunk sizes to make many batches
+    chunk_size = max(reader.totnhalos // 10, 1)
+    for batch in [np.arange(reader.ntrees), np.arange(reader.ntrees)[::3]]:
+        reader.set_batch(batch, chunk_size=chunk_size)
+        for i in batch:
+            tree = reader.read_single_tree(i)
+            for k in reader.fields:
+                np.testing.assert_array_equal(tree[k], trees[i][k])
+        for start, end in reader._batch_ranges:
+            nhalos = reader.nhalos_before_tree[end - 1] + \
+              reader.nhalos_per_tree[end - 1] - \
+              reader.nhalos_before_tree[start]
+            assert nhalos <= chunk_size + reader.nhalos_per_tree[end - 1]
+        reader.clear_batch()
+
+
 @requires_file(CTT)
 def test_fail_load():
     assert (not LHaloTreeArbor._is_valid(CTT))
@@ -1,6 +1,14 @@
+import h5py
+from numpy.testing import \
+    assert_equal
+import numpy as np
+from types import SimpleNamespace
+
 from ytree.data_structures.load import load as ytree_load
 from ytree.frontends.treefrog import \
     TreeFrogArbor
+from ytree.frontends.treefrog.io import \
+    TreeFrogForestStore
 from ytree.utilities.testing import \
     ArborTest, \
     TempDirTest
@@ -24,3 +32,52 @@ class TreeFrogArborTest(TempDirTest, ArborTest):
         for df in self.arbor.data_files:
             new_arbor = ytree_load(df.filename)
             assert isinstance(new_arbor, self.arbor_type)
+
+class TreeFrogForestStoreTest(TempDirTest):
+    def test_forest_store(self):
+        rng = np.random.default_rng(1815)
+        nforests = 40
+        nsnaps = 5
+        sizes = rng.integers(0, 6, size=(nforests, nsnaps))
+        sizes[:, -1] = np.maximum(sizes[:, -1], 1)
+        offsets = sizes.cumsum(axis=0) - sizes
+        masses = [rng.random(sizes[:, i].sum()) for i in range(nsnaps)]
+        with h5py.File("forests.hdf5", mode="w") as f:
+            g = f.create_group("ForestInfoInFile")
+            g["ForestSizesAllSnaps"] = sizes
+            g["ForestOffsetsAllSnaps"] = offsets
+            for i in range(nsnaps):
+                f[f"Snap_{i:03d}/Mass"] = masses[i]
+
+        with h5py.File("forests.hdf5", mode="r") as f:
+            nread = []
+
+            def read_data(group, field, frange=None):
+                data = f[group][field][frange]
+                nread.append(data.size)
+                return data
+
+            data_file = SimpleNamespace(fh=f, read_data=read_data)
+            # runs of neighboring forests with gaps between them
+            sel = np.where(np.arange(nforests) % 5 < 2)[0]
+            for chunk_size in [1, 20, 1000]:
+                nread.clear()
+                store = TreeFrogForestStore(
+                    data_file, sel, chunk_size=chunk_size)
+                assert 2 not in store
+                for i in sel:
+                    assert i in store
+                    isnaps = [isnap for isnap in range(nsnaps)[::-1]
+                              if sizes[i, isnap] > 0]
+                    assert_equal(
+                        store.get_field("Mass", i),
+                        np.concatenate(
+                            [masses[isnap][offsets[i, isnap]:
+                                           offsets[i, isnap] +
+                                           sizes[i, isnap]]
+                             for isnap in isnaps]))
+                    assert_equal(
+                        store.get_snapshots(i),
+                        np.repeat(isnaps, sizes[i, isnaps]))
+                # only the halos of the selected forests are read
+                assert_equal(sum(nread), sizes[sel].sum())
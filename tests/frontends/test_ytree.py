@@ -0,0 +1,189 @@
+"""
+tests for ytree frontend
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) ytree development team. All rights reserved.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import gc
+import h5py
+import numpy as np
+from numpy.testing import \
+    assert_array_equal, \
+    assert_equal, \
+    assert_raises
+from unittest import \
+    mock
+from unyt import \
+    unyt_array
+
+from ytree.frontends.ytree.io import \
+    YTreeRootField
+from ytree.utilities.testing import \
+    requires_file, \
+    TempDirTest
+
+import ytree
+
+CT = "consistent_trees/tree_0_0_0.dat"
+
+class YTreeRootFieldTest(TempDirTest):
+    @requires_file(CT)
+    def test_root_field_indexing(self):
+        a = ytree.load(CT)
+        ref = a["mass"]
+        fn = a.save_arbor()
+        a2 = ytree.load(fn)
+        size = a2.size
+
+        keys = [0, 5, -1, -size,
+                slice(None), slice(2, 10), slice(None, None, -1),
+                slice(10, 2, -3), slice(5, 5),
+                [3, 1, 3, -2], np.array([], dtype=int),
+                ref > ref.mean(), Ellipsis, (slice(1, 3),)]
+        for key in keys:
+            rf = YTreeRootField(a2, fn, "mass")
+            # never switch to reading the whole field
+            rf._max_partial_fraction = np.inf
+            data = rf[key]
+            assert_array_equal(data, ref[key])
+            assert_equal(str(data.units), str(ref.units))
+            # partial reads do not read the whole field
+            if isinstance(key, (int, slice, list, np.ndarray)):
+                assert rf._data is None
+
+        for key in [size, -size - 1, [0, size], np.array([-size - 1])]:
+            rf = YTreeRootField(a2, fn, "mass")
+            assert_raises(IndexError, rf.__getitem__, key)
+
+    @requires_file(CT)
+    def test_root_field_full_read(self):
+        a = ytree.load(CT)
+        ref = a["mass"]
+        fn = a.save_arbor()
+        a2 = ytree.load(fn)
+
+        # after too many partial reads
+        rf = YTreeRootField(a2, fn, "mass")
+        rf._max_partial_reads = 2
+        rf._max_partial_fraction = np.inf
+        rf[0]
+        rf[1:3]
+        assert rf._data is None
+        assert_array_equal(rf[4], ref[4])
+        assert rf._data is not None
+        assert_array_equal(rf.data, ref)
+
+        # once partial reads would cover too much of the field
+        rf = YTreeRootField(a2, fn, "mass")
+        nrows = int(rf._max_partial_fraction * a2.size)
+        assert_array_equal(rf[:nrows], ref[:nrows])
+        assert rf._data is None
+        assert_array_equal(rf[nrows], ref[nrows])
+        assert rf._data is not None
+
+    @requires_file(CT)
+    def test_root_field_arrays(self):
+        a = ytree.load(CT)
+        ref = a["mass"]
+        fn = a.save_arbor()
+
+        def get_mass():
+            return ytree.load(fn)["mass"]
+
+        # still works after the arbor is gone
+        mass = get_mass()
+        gc.collect()
+        assert_array_equal(mass[:3], ref[:3])
+
+        a2 = ytree.load(fn)
+        mass = a2["mass"]
+        assert isinstance(mass, unyt_array)
+        for data in [a2.arr(mass), unyt_array(mass)]:
+            assert type(data) is unyt_array
+            assert_array_equal(data, ref)
+            assert_equal(str(data.units), str(ref.units))
+
+    @requires_file(CT)
+    def test_root_field_setitem(self):
+        a = ytree.load(CT)
+        fn = a.save_arbor()
+        a2 = ytree.load(fn)
+        a2.add_analysis_field("bears", "Msun/yr")
+        my_tree = a2[0]
+        my_tree["bears"] = 5
+        fn = a2.save_arbor(trees=[my_tree])
+
+        a3 = ytree.load(fn)
+        assert_equal(a3.field_info["bears"]["type"], "analysis_saved")
+        bears = a3["bears"]
+        bears[1] = 7
+        assert_array_equal(a3["bears"][:3], a3.arr([5, 7, 0], "Msun/yr"))
+
+class YTreeFieldCacheTest(TempDirTest):
+    @requires_file(CT)
+    def test_single_tree_read(self):
+        a = ytree.load(CT)
+        fn = a.save_arbor()
+        a2 = ytree.load(fn)
+
+        read_field = a2._node_io._read_field
+        with mock.patch.object(a2._node_io, "_read_field",
+                               side_effect=read_field) as rf:
+            for i in [0, a2.size // 2, a2.size - 1]:
+                my_tree = a2[i]
+                assert_array_equal(my_tree["tree", "mass"],
+                                   a[i]["tree", "mass"])
+                assert_array_equal(my_tree["prog", "mass"],
+                                   a[i]["prog", "mass"])
+            # only parts of fields are read
+            assert rf.call_count > 0
+            for call in rf.call_args_list:
+                assert call.kwargs.get("frange") is not None
+
+        for data_file in a2.data_files:
+            assert data_file._field_cache is None
+
+    @requires_file(CT)
+    def test_small_cache(self):
+        a = ytree.load(CT)
+        fn = a.save_arbor()
+
+        fields = ["mass", "virial_radius", "position"]
+
+        def get_fields(node):
+            caches = [data_file._field_cache
+                      for data_file in node.arbor.data_files
+                      if data_file._field_cache is not None]
+            for cache in caches:
+                assert cache.size <= cache.max_size
+            return [node["tree", field] for field in fields]
+
+        a2 = ytree.load(fn)
+        ref = a2._node_io_loop(get_fields)
+
+        # the size of the largest field in any data file
+        nbytes = 0
+        for data_file in a2.data_files:
+            with h5py.File(data_file.filename, mode="r") as f:
+                nbytes = max(nbytes, f["data/mass"].size *
+                             f["data/mass"].dtype.itemsize)
+
+        # too small for any field and room for only one field
+        for cache_size in [1, nbytes]:
+            a3 = ytree.load(fn, cache_size=cache_size)
+            data = a3._node_io_loop(get_fields)
+            assert_equal(len(data), len(ref))
+            for tree_data, ref_data in zip(data, ref):
+                for fdata, rdata in zip(tree_data, ref_data):
+                    assert_array_equal(fdata, rdata)
+            for data_file in a3.data_files:
+                assert data_file._field_cache is None
@@ -13,9 +13,17 @@ miscellaneous utility tests
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+import numpy as np
+from numpy.testing import \
+    assert_array_equal
 import os
+from types import \
+    SimpleNamespace
+
 from ytree.data_structures.load import \
     load as ytree_load
+from ytree.data_structures.tree_node_selector import \
+    _select_field_value
 from ytree.utilities.io import \
     f_text_block
 from ytree.utilities.loading import \
@@ -73,3 +81,35 @@ def test_field_access_without_tree_setup():
     a = ytree_load(R0)
     t = a[a['mass'].argmax()]
     list(t.ancestors)[0]['desc_uid']
+
+def test_select_field_value():
+    """
+    Test max/min ancestor selection against np.argmax/np.argmin,
+    including unsigned and extreme integers, ties, and NaNs.
+    """
+
+    anc_offsets = np.array([0, 3, 3, 5, 8, 9])
+    anc_indices = np.array([1, 2, 3, 4, 0, 2, 3, 4, 1])
+    values_list = [
+        np.array([0, 0, 2, 1, 2], dtype=np.uint64),
+        np.array([0, 0, 2, 1, 2], dtype=np.uint8),
+        np.array([np.iinfo(np.int64).min, -1, 3, 3,
+                  np.iinfo(np.int64).min]),
+        np.array([1., np.nan, 2., 2., np.nan]),
+    ]
+
+    for values in values_list:
+        root_node = SimpleNamespace(
+            arbor=SimpleNamespace(_node_io=SimpleNamespace(
+                get_fields=lambda *args, **kwargs: None)),
+            field_data={"field": values},
+            _anc_offsets=anc_offsets, _anc_indices=anc_indices)
+        for use_max, func in [(True, np.argmax), (False, np.argmin)]:
+            expected = []
+            for start, end in zip(anc_offsets[:-1], anc_offsets[1:]):
+                ancs = anc_indices[start:end]
+                expected.append(
+                    ancs[func(values[ancs])] if ancs.size else -1)
+            assert_array_equal(
+                _select_field_value(root_node, "field", use_max),
+                expected)
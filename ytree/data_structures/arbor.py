@@ -13,8 +13,6 @@ Arbor class and member functions
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
-from collections import \
-    defaultdict
 import functools
 import numpy as np
 import os
@@ -25,6 +23,7 @@ from unyt import \
 
 from yt.funcs import \
     get_pbar, \
+    is_root, \
     TqdmProgressBar
 from unyt.dimensions import \
     dimensionless, \
@@ -42,14 +41,22 @@ from ytree.data_structures.fields import \
 from ytree.data_structures.io import \
     DefaultRootFieldIO, \
     TreeFieldIO
-from ytree.data_structures.node_link import \
-    NodeLink
 from ytree.data_structures.save_arbor import \
     save_arbor
 from ytree.data_structures.tree_node import \
     TreeNode
 from ytree.data_structures.tree_node_selector import \
     tree_node_selector_registry
+from ytree.data_structures.tree_topology import \
+    get_ancestor_arrays, \
+    get_descendent_indices, \
+    get_tree_order
+from ytree.utilities.cache import \
+    cache_enabled, \
+    get_cache_filename, \
+    get_file_signature, \
+    load_cache_file, \
+    save_cache_file
 from ytree.utilities.logger import \
     ytreeLogger, \
     fake_pbar
@@ -102,7 +109,9 @@ class Arbor(metaclass=RegisteredArbor):
     ### deciding when they are setup or grown.
     _reset_attrs = ("_tfi", "_pfi")
     _setup_attrs = ("_desc_uids", "_uids")
-    _grow_attrs = ("_link_storage", "_link")
+    _grow_attrs = ("_desc_indices", "_anc_offsets", "_anc_indices",
+                   "_tree_order", "_tree_start", "_tree_end",
+                   "_prog_indices", "_prog_selector")
 
     omega_matter = None
     omega_lambda = None
@@ -250,6 +259,111 @@ class Arbor(metaclass=RegisteredArbor):
             dict((attr, -np.ones(self._size, dtype=np.int64))
                 for attr in self._node_too_attrs))
 
+    # Bump this when a change to a frontend's _plant_trees
+    # changes what is stored in _node_info.
+    _plant_cache_version = 1
+    _plant_cache_info = None
+
+    def _get_plant_cache_files(self):
+        """
+        Return the files whose contents determine the results
+        of planting. Caches are invalidated when any of them change.
+        """
+
+        if isinstance(self.filename, (list, tuple)):
+            fns = list(self.filename)
+        else:
+            fns = [self.filename]
+        for data_file in getattr(self, "data_files", []):
+            if data_file is not None and data_file.filename not in fns:
+                fns.append(data_file.filename)
+        return fns
+
+    def _get_plant_cache_key(self):
+        """
+        Return anything, other than file names, that changes the
+        results of planting.
+        """
+        return ()
+
+    def _get_plant_cache_state(self):
+        """
+        Return a dict of arrays, beyond _node_info and the arbor
+        size, needed to restore the results of planting.
+        """
+        return {}
+
+    def _set_plant_cache_state(self, state):
+        """
+        Restore state returned by _get_plant_cache_state.
+        """
+        pass
+
+    def _load_plant_cache(self):
+        """
+        Restore the results of planting from the on-disk cache.
+
+        This is opt-in with the plant_cache config option. Returns
+        True if the cache was used. Otherwise, the cache filename
+        and file signature are stored for _save_plant_cache.
+        """
+
+        if not cache_enabled("plant_cache"):
+            return False
+
+        fns = self._get_plant_cache_files()
+        signature = get_file_signature(fns)
+        filename = get_cache_filename(
+            "plant", type(self).__name__, self._plant_cache_version,
+            *signature["filenames"], *self._get_plant_cache_key())
+        self._plant_cache_info = (filename, signature)
+
+        data = load_cache_file(filename, signature)
+        if data is None:
+            return False
+
+        prefix = "node_info_"
+        node_info = dict((key[len(prefix):], val)
+                         for key, val in data.items()
+                         if key.startswith(prefix))
+        prefix = "state_"
+        state = dict((key[len(prefix):], val)
+                     for key, val in data.items()
+                     if key.startswith(prefix))
+
+        self._size = int(data["size"])
+        self._node_info_storage = node_info
+        self._set_plant_cache_state(state)
+        missing = [attr for attr in self._node_con_attrs +
+                   self._node_io_attrs + self._node_too_attrs
+                   if attr not in self._node_info_storage]
+        if missing:
+            self._node_info_storage = None
+            return False
+
+        ytreeLogger.info(f"Loaded {self._size} trees from {filename}.")
+        return True
+
+    def _save_plant_cache(self):
+        """
+        Save the results of planting to the on-disk cache.
+        """
+
+        if self._plant_cache_info is None:
+            return
+        filename, signature = self._plant_cache_info
+        self._plant_cache_info = None
+        if not is_root():
+            return
+
+        data = {"size": np.array(self._size, dtype=np.int64)}
+        for attr, val in self._node_info.items():
+            if val.dtype != object:
+                data[f"node_info_{attr}"] = val
+        for attr, val in self._get_plant_cache_state().items():
+            data[f"state_{attr}"] = val
+        save_cache_file(filename, signature, data)
+
     def is_setup(self, tree_node):
         """
         Return True if arrays of uids and descendent uids have
@@ -303,37 +417,44 @@ class Arbor(metaclass=RegisteredArbor):
             return
 
         self._setup_tree(tree_node, **kwargs)
-        size      = tree_node.tree_size
-        uids      = tree_node.uids
-        desc_uids = tree_node.desc_uids
-        links     = np.empty(size, dtype=object)
-
-        # Make a dict mapping uids to index of storage array.
-        # First, try to get indices out as the dict is constructed
-        # since the dict will be smaller at first.
-        uidmap = {}
-        not_found = []
-        for i, (uid, desc_uid) in enumerate(zip(uids, desc_uids)):
-            node = NodeLink(i)
-            uidmap[uid] = i
-            desc_index = uidmap.get(desc_uid)
-            if desc_index is None:
-                not_found.append((node, desc_uid))
-            else:
-                desc = links[desc_index]
-                desc.add_ancestor(node)
-            links[i] = node
-
-        # Make any additional links missed on the first pass.
-        for node, desc_uid in not_found:
-            if desc_uid == -1:
-                continue
-            desc = links[uidmap[desc_uid]]
-            desc.add_ancestor(node)
+        desc_indices = get_descendent_indices(
+            tree_node.uids, tree_node.desc_uids)
 
         tree_node.root = tree_node
-        tree_node._link = links[0]
-        tree_node._link_storage = links
+        tree_node._desc_indices = desc_indices
+        tree_node._anc_offsets, tree_node._anc_indices = \
+          get_ancestor_arrays(desc_indices)
+
+    def _order_tree(self, tree_node):
+        """
+        Compute the depth-first ordering of all nodes in the tree
+        so the tree beneath any node is a contiguous range.
+
+        This is done once for a root node after the tree is grown.
+        """
+
+        if tree_node._tree_order is not None:
+            return
+
+        tree_node._tree_order, tree_node._tree_start, \
+          tree_node._tree_end = get_tree_order(
+              tree_node._desc_indices, tree_node._anc_offsets,
+              tree_node._anc_indices)
+
+    def _select_progenitors(self, tree_node):
+        """
+        Select the progenitor of every node in the tree at once.
+
+        This returns an array of the tree_id of each node's
+        progenitor (-1 if none) or None if the current selector
+        cannot make a batch selection. The result is kept by the
+        root node until the selector is changed.
+        """
+
+        if tree_node._prog_selector is not self.selector:
+            tree_node._prog_indices = self.selector.select_all(tree_node)
+            tree_node._prog_selector = self.selector
+        return tree_node._prog_indices
 
     _attr_map = None
     def _build_attr(self, attr, tree_node):
@@ -585,18 +706,17 @@ class Arbor(metaclass=RegisteredArbor):
 
         return my_node
 
-    def _generate_tree_node(self, root_node, node_link):
+    def _generate_tree_node(self, root_node, tree_id):
         """
         Create a non-root node in a tree.
         """
 
-        tree_id = node_link.tree_id
         if tree_id == 0:
             return root_node
-        uid        = root_node.uids[tree_id]
-        node       = TreeNode(uid, arbor=self, root=False)
-        node.root  = root_node
-        node._link = node_link
+        uid           = root_node.uids[tree_id]
+        node          = TreeNode(uid, arbor=self, root=False)
+        node.root     = root_node
+        node._tree_id = tree_id
         return node
 
     def _store_node_info(self, tree_node, attr):
@@ -1069,21 +1189,37 @@ class SegmentedArbor(Arbor):
     def _node_io_loop_finish(self, data_file):
         data_file.close()
 
-    def _node_io_loop_prepare(self, nodes):
+    def _get_node_file_indices(self, nodes, attrs=('_fi', '_si')):
+        """
+        Get the data file indices and indices within those files
+        of the trees of a list of nodes, or any other io attributes
+        given by attrs.
+        """
+
         if nodes is None:
-            nodes = np.arange(self.size)
-            fi = self._node_info['_fi']
-            si = self._node_info['_si']
+            return tuple(self._node_info[attr] for attr in attrs)
         elif nodes.dtype == object:
-            fi = np.array(
-                [node._fi if node.is_root else node.root._fi
-                 for node in nodes])
-            si = np.array(
-                [node._si if node.is_root else node.root._si
-                 for node in nodes])
+            roots = [node if node.is_root else node.root
+                     for node in nodes]
+            return tuple(
+                np.array([getattr(root, attr) for root in roots])
+                for attr in attrs)
         else: # assume an array of indices
-            fi = self._node_info['_fi'][nodes]
-            si = self._node_info['_si'][nodes]
+            return tuple(self._node_info[attr][nodes] for attr in attrs)
+
+    def _group_node_file_indices(self, nodes, attrs=('_fi', '_si')):
+        """
+        Group nodes by data file, ordered by where their trees are
+        within each file.
+
+        The first two of attrs give the data file index and the index
+        within that file. Returns the values of attrs for each node,
+        the indices of the data files, the indices of the nodes in
+        each file, and the order to return them to the original order.
+        """
+
+        vals = self._get_node_file_indices(nodes, attrs=attrs)
+        fi, si = vals[:2]
 
         # the order they will be processed
         io_order = np.lexsort((si, fi))
@@ -1093,9 +1229,14 @@ class SegmentedArbor(Arbor):
         return_order[io_order] = np.arange(io_order.size)
 
         ufi = np.unique(fi)
-        data_files = [self.data_files[i] for i in ufi]
         index_list = [io_order[fi == i] for i in ufi]
 
+        return vals, ufi, index_list, return_order
+
+    def _node_io_loop_prepare(self, nodes):
+        _, ufi, index_list, return_order = \
+          self._group_node_file_indices(nodes)
+        data_files = [self.data_files[i] for i in ufi]
         return data_files, index_list, return_order
 
 class CatalogArbor(Arbor):
@@ -1120,7 +1261,10 @@ class CatalogArbor(Arbor):
 
     # Don't reset _ancestors or descendents because we won't be able to
     # rebuild trees without calling _plant_trees again.
-    _setup_attrs = ("_desc_uids", "_uids", "_nodes", "_link_storage")
+    _setup_attrs = ("_desc_uids", "_uids", "_nodes",
+                    "_desc_indices", "_anc_offsets", "_anc_indices",
+                    "_tree_order", "_tree_start", "_tree_end",
+                    "_prog_indices", "_prog_selector")
     _grow_attrs = ()
 
     def __init__(self, filename):
@@ -1168,12 +1312,11 @@ class CatalogArbor(Arbor):
         if self.is_planted:
             return
 
-        # This is a somewhat hacky way of catching halos with links
-        # spanning more than one data set. That said, dict access
-        # is much faster than I thought and perhaps this whole
-        # routine needs to be refactored.
+        # Halos with links spanning more than one data set are
+        # connected at the end by searching all uids.
         if self._has_uids:
-            all_dict = {}
+            all_uids = []
+            all_nodes = []
             missed_connections = []
 
         # this can be called once with the list, but fields are
@@ -1190,86 +1333,110 @@ class CatalogArbor(Arbor):
         uid = 0
         trees = []
         nfiles = len(self.data_files)
-        descs = lastids = None
+        descs = lastids = lastids_sorted = lastids_order = None
         pbar = get_pbar("Planting trees", len(self.data_files))
         for i, dfl in enumerate(self.data_files):
             if not isinstance(dfl, list):
                 dfl = [dfl]
 
             batches = []
-            bsize = []
             hids = []
-            ancs = defaultdict(list)
+            anc_nodes = []
+            anc_descs = []
             for data_file in dfl:
                 data = data_file._read_fields(fields, dtypes=dtypes)
-                nhalos = len(data[halo_id_f])
-                batch = np.empty(nhalos, dtype=object)
-
-                for it in range(nhalos):
-                    descid = data[desc_id_f][it]
-                    if self._has_uids:
-                        my_uid = data[halo_id_f][it]
-                    else:
-                        my_uid = uid
-                    root = i == 0 or descid == -1
+                hid = np.asarray(data[halo_id_f], dtype=np.int64)
+                descid = np.asarray(data[desc_id_f], dtype=np.int64)
+                nhalos = hid.size
+                if self._has_uids:
+                    my_uids = hid
+                else:
+                    my_uids = range(uid, uid + nhalos)
+                uid += nhalos
+
+                # Find each descendent in the previous data set by
+                # searching the sorted halo ids.
+                if i == 0:
+                    root = np.ones(nhalos, dtype=bool)
+                    missing = ~root
+                else:
+                    idesc = np.searchsorted(lastids_sorted, descid)
+                    found = (descid != -1) & (idesc < lastids_sorted.size)
+                    found[found] = lastids_sorted[idesc[found]] == descid[found]
+                    root = ~found
                     # The data says a descendent exists, but it's not there.
                     # This shouldn't happen, but it does sometimes.
                     # This can also happen when a descendent is more than
                     # one snapshot removed.
-                    mcollect = False
-                    if not root and descid not in lastids:
-                        root = True
-                        my_descid = descid
-                        descid = data[desc_id_f][it] = -1
-                        if self._has_uids:
-                            mcollect = True
-                    tree_node = TreeNode(my_uid, arbor=self, root=root)
+                    missing = root & (descid != -1)
+
+                batch = np.empty(nhalos, dtype=object)
+                for it in range(nhalos):
+                    tree_node = TreeNode(my_uids[it], arbor=self, root=root[it])
                     tree_node._fi = it
                     tree_node.data_file = data_file
                     batch[it] = tree_node
-
-                    if self._has_uids:
-                        all_dict[my_uid] = tree_node
-
-                    if root:
-                        if mcollect:
-                            tree_node._desc_uid = my_descid
-                            missed_connections.append(tree_node)
-                        else:
-                            trees.append(tree_node)
-                    else:
-                        ancs[descid].append(tree_node)
-                    uid += 1
                 data_file.trees = batch
                 batches.append(batch)
-                bsize.append(batch.size)
-                hids.append(data[halo_id_f])
-
+                hids.append(hid)
+
+                if self._has_uids:
+                    all_uids.append(hid)
+                    all_nodes.append(batch)
+                    for tree_node, my_descid in \
+                      zip(batch[missing], descid[missing]):
+                        tree_node._desc_uid = my_descid
+                        missed_connections.append(tree_node)
+                    trees.extend(batch[root & ~missing])
+                else:
+                    trees.extend(batch[root])
+
+                if i > 0:
+                    anc_nodes.append(batch[~root])
+                    anc_descs.append(lastids_order[idesc[~root]])
+
+            # Hand each descendent its list of ancestors.
             if i > 0:
-                for descid, ancestors in ancs.items():
-                    # this will not be fast
-                    descendent = descs[descid == lastids][0]
+                anc_nodes = np.concatenate(anc_nodes)
+                anc_descs = np.concatenate(anc_descs)
+                order = np.argsort(anc_descs, kind="stable")
+                anc_nodes = anc_nodes[order]
+                anc_descs = anc_descs[order]
+                bounds = np.concatenate(
+                    [[0], np.where(np.diff(anc_descs))[0] + 1,
+                     [anc_descs.size]])
+                for istart, iend in zip(bounds[:-1], bounds[1:]):
+                    if istart == iend:
+                        continue
+                    descendent = descs[anc_descs[istart]]
+                    ancestors = list(anc_nodes[istart:iend])
                     descendent._ancestors = ancestors
                     for ancestor in ancestors:
                         ancestor._descendent = descendent
 
             if i < nfiles - 1:
-                descs = np.empty(sum(bsize), dtype=object)
-                lastids = np.empty(descs.size, dtype=np.int64)
-                ib = 0
-                for batch, hid, bs in zip(batches, hids, bsize):
-                    descs[ib:ib+bs] = batch
-                    lastids[ib:ib+bs] = hid
-                    ib += bs
+                descs = np.concatenate(batches)
+                lastids = np.concatenate(hids)
+                lastids_order = np.argsort(lastids, kind="stable")
+                lastids_sorted = lastids[lastids_order]
             pbar.update(i+1)
         pbar.finish()
 
-        if self._has_uids:
-            for node in missed_connections:
-                my_desc_uid = node._desc_uid
-                my_desc = all_dict[my_desc_uid]
+        if self._has_uids and missed_connections:
+            all_uids = np.concatenate(all_uids)
+            all_nodes = np.concatenate(all_nodes)
+            missed_uids = np.array(
+                [node._desc_uid for node in missed_connections],
+                dtype=np.int64)
+            missed_descs = get_descendent_indices(all_uids, missed_uids)
+            for node, idesc in zip(missed_connections, missed_descs):
                 delattr(node, "_desc_uid")
+                # descendent is nowhere to be found, make it a root
+                if idesc < 0:
+                    trees.append(node)
+                    continue
 
+                my_desc = all_nodes[idesc]
                 node._descendent = my_desc
                 node.root = my_desc.root
                 if my_desc._ancestors is None:
@@ -1293,24 +1460,23 @@ class CatalogArbor(Arbor):
         uids      = []
         desc_uids = [-1]
         # This is redundant, but enables functionality that uses
-        # the link storage, like TreeNode.get_node.
-        links     = []
+        # the ancestor arrays, like TreeNode.get_node.
+        desc_indices = [-1]
         for i, node in enumerate(tree_node._tree_nodes):
             node._tree_id = i
             node.root     = tree_node
             nodes.append(node)
             uids.append(node.uid)
-            link = NodeLink(i)
-            links.append(link)
             if i > 0:
                 desc_uids.append(node.descendent.uid)
-                desc_link = links[node.descendent.tree_id]
-                desc_link.add_ancestor(link)
+                desc_indices.append(node.descendent.tree_id)
         tree_node._nodes     = np.array(nodes)
         tree_node._uids      = np.array(uids)
         tree_node._desc_uids = np.array(desc_uids)
         tree_node._tree_size = tree_node._uids.size
-        tree_node._link_storage = np.array(links)
+        tree_node._desc_indices = np.array(desc_indices, dtype=np.int64)
+        tree_node._anc_offsets, tree_node._anc_indices = \
+          get_ancestor_arrays(tree_node._desc_indices)
         # This should bypass any attempt to get this field in
         # the conventional way.
         if self.field_info["uid"].get("source") == "arbor":
@@ -1322,3 +1488,9 @@ class CatalogArbor(Arbor):
         Trees are grown when they are planted.
         """
         pass
+
+    def _generate_tree_node(self, root_node, tree_id):
+        """
+        Return a node from the array made in _setup_tree.
+        """
+        return root_node._nodes[tree_id]
@@ -18,8 +18,15 @@ import numpy as np
 import os
 import weakref
 
+from ytree.utilities.cache import \
+    cache_enabled, \
+    get_column_cache, \
+    ColumnCache
 from ytree.utilities.exceptions import \
     ArborAnalysisFieldNotGenerated
+from ytree.utilities.io import \
+    parse_text_columns, \
+    read_text_ranges
 from ytree.utilities.logger import \
     ytreeLogger as mylog
 
@@ -402,11 +409,116 @@ class CatalogDataFile(DataFile):
         """
         raise NotImplementedError
 
-    def _read_data_select(self, rfields, tree_nodes, dtypes):
+    def _read_text_columns(self, filename, rfields, dtypes):
         """
-        Read field data for a given set of halos.
+        Read field data for all halos in a text file.
+
+        This sets the offsets array of line starting positions. If
+        the column cache is on, fields and offsets are taken from it
+        when there and saved to it when not. Cached arrays are
+        returned memory-mapped.
         """
-        raise NotImplementedError
+
+        fi = self.arbor.field_info
+        columns = dict((field, fi[field]["column"]) for field in rfields)
+        names = dict((field, ColumnCache.column_name(
+            columns[field], dtypes[field])) for field in rfields)
+
+        field_data = {}
+        cache = get_column_cache(filename)
+        if cache is not None:
+            for field in rfields:
+                data = cache.get(names[field])
+                if data is not None:
+                    field_data[field] = data
+            if self.offsets is None:
+                self.offsets = cache.get("offsets")
+        missing = [field for field in rfields if field not in field_data]
+        if not missing and self.offsets is not None:
+            return field_data
+
+        with open(filename, "rb") as f:
+            f.seek(self._hoffset)
+            buff = f.read(self.file_size - self._hoffset)
+
+        if self.offsets is None:
+            # Lines start at the beginning and after each newline.
+            # Skip empty and comment lines, as the parser does.
+            cdata = np.frombuffer(buff, dtype=np.uint8)
+            starts = np.concatenate(
+                [[0], np.flatnonzero(cdata == ord("\n")) + 1])
+            starts = starts[starts < cdata.size]
+            first = cdata[starts]
+            keep = (first != ord("\n")) & (first != ord("#"))
+            self.offsets = starts[keep] + self._hoffset
+            if cache is not None:
+                cache.save("offsets", self.offsets)
+
+        new_data = parse_text_columns(
+            buff.decode(), missing, columns, dtypes)
+        if cache is not None:
+            for field in missing:
+                cache.save(names[field], new_data[field])
+        field_data.update(new_data)
+
+        return field_data
+
+    def _read_text_default(self, filename, rfields, dtypes):
+        """
+        Read field data for all halos from a text file.
+        """
+
+        if not rfields:
+            return {}
+
+        field_data = self._read_text_columns(filename, rfields, dtypes)
+        for field in rfields:
+            if isinstance(field_data[field], np.memmap):
+                field_data[field] = np.array(field_data[field])
+        return field_data
+
+    def _read_text_select(self, filename, rfields, tree_nodes, dtypes):
+        """
+        Read field data for a given set of halos from a text file.
+
+        This uses the offsets array of line starting positions.
+        The requested lines are sorted by position, read from the
+        file at once, parsed together, and returned in node order.
+        If the column cache is on, values are taken from cached
+        columns instead.
+        """
+
+        if not rfields:
+            return {}
+
+        indices = np.array([node._fi for node in tree_nodes])
+
+        if cache_enabled("column_cache"):
+            field_data = self._read_text_columns(filename, rfields, dtypes)
+            return dict((field, field_data[field][indices])
+                        for field in rfields)
+
+        fi = self.arbor.field_info
+        columns = dict((field, fi[field]["column"]) for field in rfields)
+
+        order = indices.argsort(kind="stable")
+        indices = indices[order]
+
+        # Each line ends where the next begins, so the
+        # newline is included and lines stay separated.
+        starts = self.offsets[indices]
+        line_ends = np.append(self.offsets[1:], self.file_size)
+        ends = line_ends[indices]
+
+        text = read_text_ranges(filename, starts, ends)
+        sdata = parse_text_columns(text, rfields, columns, dtypes)
+
+        field_data = self._create_field_arrays(
+            rfields, dtypes, size=order.size)
+        for field in rfields:
+            field_data[field][order] = sdata[field]
+
+        return field_data
 
     def _read_fields(self, fields, tree_nodes=None, dtypes=None):
         """
@@ -32,8 +32,6 @@ class TreeNode:
     tree beneath.
     """
 
-    _link = None
-
     def __init__(self, uid, arbor=None, root=False):
         """
         Initialize a TreeNode with at least its halo catalog ID and
@@ -55,15 +53,12 @@ class TreeNode:
         """
         if self.is_root:
             return 0
-        elif self._link is not None:
-            return self._link.tree_id
-        else:
-            return self._tree_id
+        return self._tree_id
 
     @tree_id.setter
     def tree_id(self, value):
         """
-        Set the tree_id manually in CatalogArbors.
+        Set the tree_id manually.
         """
         self._tree_id = value
 
@@ -125,10 +120,11 @@ class TreeNode:
             return self._descendent
 
         # conventional Arbor object
-        desc_link = self._link.descendent
-        if desc_link is None:
+        root = self.root
+        desc_index = root._desc_indices[self.tree_id]
+        if desc_index < 0:
             return None
-        return self.arbor._generate_tree_node(self.root, desc_link)
+        return self.arbor._generate_tree_node(root, desc_index)
 
     _ancestors = None # used by CatalogArbor
     @property
@@ -139,10 +135,13 @@ class TreeNode:
 
         self.arbor._grow_tree(self)
 
-        # conventional Arbor object
-        if self._link is not None:
-            for link in self._link.ancestors:
-                yield self.arbor._generate_tree_node(self.root, link)
+        # conventional Arbor object or CatalogArbor after _setup_tree
+        if self._has_topology:
+            root = self.root
+            tree_id = self.tree_id
+            istart, iend = root._anc_offsets[tree_id:tree_id+2]
+            for anc_index in root._anc_indices[istart:iend]:
+                yield self.arbor._generate_tree_node(root, anc_index)
             return
 
         # If tree is not setup yet, the ancestor nodes will not have
@@ -200,20 +199,28 @@ class TreeNode:
             self._tree_size = len(list(self["tree"]))
         return self._tree_size
 
-    _link_storage = None
+    _desc_indices = None
+    _anc_offsets = None
+    _anc_indices = None
+    _tree_order = None
+    _tree_start = None
+    _tree_end = None
+    _prog_indices = None
+    _prog_selector = None
     @property
-    def _links(self):
+    def _has_topology(self):
         """
-        Array of NodeLink objects with the ancestor/descendent structure.
+        Has the root of this tree stored the ancestor/descendent structure?
 
-        This is only used by conventional Arbor objects, i.e., not
-        CatalogArbor objects.
+        The structure is held by the root node in three arrays:
+        _desc_indices, the tree_id of each node's descendent (-1 if
+        none); and _anc_offsets and _anc_indices, the tree_ids of each
+        node's ancestors in compressed form. See
+        :func:`~ytree.data_structures.tree_topology.get_ancestor_arrays`.
         """
-        if not self.is_root:
-            return None
-        if self._link_storage is None:
-            self.arbor._build_attr("_link_storage", self)
-        return self._link_storage
+        root = self.root
+        return isinstance(root, TreeNode) and \
+          root._anc_offsets is not None
 
     def __setitem__(self, key, value):
         """
@@ -367,8 +374,10 @@ class TreeNode:
         if indices is None:
             raise RuntimeError("Bad selector.")
 
-        my_link = self.root._links[indices][index]
-        return self.arbor._generate_tree_node(self.root, my_link)
+        root = self.root
+        if isinstance(indices, slice):
+            indices = range(root.tree_size)[indices]
+        return self.arbor._generate_tree_node(root, indices[index])
 
     def get_leaf_nodes(self, selector=None):
         """
@@ -462,8 +471,8 @@ class TreeNode:
 
         self.arbor._grow_tree(self)
         root = self.root
-        for link in root._links:
-            yield self.arbor._generate_tree_node(self.root, link)
+        for tree_id in range(root.tree_size):
+            yield self.arbor._generate_tree_node(root, tree_id)
 
     @property
     def _tree_nodes(self):
@@ -486,6 +495,14 @@ class TreeNode:
 
         self.arbor._grow_tree(self)
         yield self
+
+        # conventional Arbor object or CatalogArbor after _setup_tree
+        if self._has_topology:
+            root = self.root
+            for tree_id in self._tree_field_indices[1:]:
+                yield self.arbor._generate_tree_node(root, tree_id)
+            return
+
         if self.ancestors is None:
             return
         for ancestor in self.ancestors:
@@ -504,7 +521,14 @@ class TreeNode:
             return self._tfi
 
         self.arbor._grow_tree(self)
-        self._tfi = np.array([node.tree_id for node in self._tree_nodes])
+        if self._has_topology:
+            root = self.root
+            self.arbor._order_tree(root)
+            tree_id = self.tree_id
+            self._tfi = root._tree_order[
+                root._tree_start[tree_id]:root._tree_end[tree_id]]
+        else:
+            self._tfi = np.array([node.tree_id for node in self._tree_nodes])
         return self._tfi
 
     @property
@@ -527,6 +551,13 @@ class TreeNode:
         """
 
         self.arbor._grow_tree(self)
+        if self._get_prog_indices() is not None:
+            root = self.root
+            yield self
+            for tree_id in self._prog_field_indices[1:]:
+                yield self.arbor._generate_tree_node(root, tree_id)
+            return
+
         my_node = self
         while my_node is not None:
             yield my_node
@@ -548,9 +579,29 @@ class TreeNode:
             return self._pfi
 
         self.arbor._grow_tree(self)
-        self._pfi = np.array([node.tree_id for node in self._prog_nodes])
+        prog_indices = self._get_prog_indices()
+        if prog_indices is None:
+            self._pfi = np.array([node.tree_id for node in self._prog_nodes])
+            return self._pfi
+
+        pfi = []
+        tree_id = self.tree_id
+        while tree_id >= 0:
+            pfi.append(tree_id)
+            tree_id = prog_indices[tree_id]
+        self._pfi = np.array(pfi)
         return self._pfi
 
+    def _get_prog_indices(self):
+        """
+        Return the array of progenitor tree_ids for all nodes in the
+        tree if the selector can make them all at once, else None.
+        """
+
+        if not self._has_topology:
+            return None
+        return self.arbor._select_progenitors(self.root)
+
     def save_tree(self, filename=None, fields=None):
         r"""
         Save the tree to a file.
@@ -20,7 +20,7 @@ from yt.utilities.operator_registry import \
 
 tree_node_selector_registry = OperatorRegistry()
 
-def add_tree_node_selector(name, function):
+def add_tree_node_selector(name, function, batch_function=None):
     r"""
     Add a TreeNodeSelector to the registry of known selectors, so they
     can be chosen with :func:`~ytree.data_structures.arbor.Arbor.set_selector`.
@@ -31,6 +31,14 @@ def add_tree_node_selector(name, function):
         Name of the selector.
     function : callable
         The associated function.
+    batch_function : optional, callable
+        A function that makes the same selection for every node in a
+        tree at once. It should accept the root TreeNode of a tree,
+        followed by the same arguments as the function above, and
+        return an array with the tree_id of the selected ancestor of
+        each node in the tree, or -1 for nodes with no ancestors.
+        If not given, progenitors are selected one node at a time.
+        Default: None.
 
     Examples
     --------
@@ -45,7 +53,8 @@ def add_tree_node_selector(name, function):
     >>> print (a[0]["prog"])
 
     """
-    tree_node_selector_registry[name] = TreeNodeSelector(function)
+    tree_node_selector_registry[name] = \
+      TreeNodeSelector(function, batch_function=batch_function)
 
 class TreeNodeSelector:
     r"""
@@ -73,8 +82,10 @@ class TreeNodeSelector:
     >>> print (a[0]["prog"])
 
     """
-    def __init__(self, function, args=None, kwargs=None):
+    def __init__(self, function, args=None, kwargs=None,
+                 batch_function=None):
         self.function = function
+        self.batch_function = batch_function
         self.args = args
         if self.args is None: self.args = []
         self.kwargs = kwargs
@@ -83,6 +94,53 @@ class TreeNodeSelector:
     def __call__(self, ancestors):
         return self.function(ancestors, *self.args, **self.kwargs)
 
+    def select_all(self, root_node):
+        """
+        Select the ancestor of every node in a tree at once.
+
+        Returns an array of tree_ids of selected ancestors or
+        None if no batch function was provided.
+        """
+        if self.batch_function is None:
+            return None
+        return self.batch_function(root_node, *self.args, **self.kwargs)
+
+def _select_field_value(root_node, field, use_max):
+    r"""
+    Select the ancestor of every node in a tree with the maximum
+    or minimum value of a field.
+
+    This performs a segmented argmax/argmin over the ancestor groups
+    of all nodes. As with np.argmax/np.argmin, the first ancestor is
+    chosen in case of ties and NaNs are always selected.
+    """
+
+    root_node.arbor._node_io.get_fields(
+        root_node, fields=[field], root_only=False)
+    values = np.asarray(root_node.field_data[field])
+
+    anc_offsets = root_node._anc_offsets
+    anc_indices = root_node._anc_indices
+    counts = np.diff(anc_offsets)
+    groups = np.repeat(np.arange(counts.size), counts)
+    anc_values = values[anc_indices]
+    nan_values = np.isnan(anc_values)
+    position = np.arange(anc_values.size)
+
+    # Sort each group by value, with NaNs and the first of equal
+    # values at the end for max or the start for min.
+    has_anc = counts > 0
+    if use_max:
+        order = np.lexsort((-position, anc_values, nan_values, groups))
+        select = anc_offsets[1:][has_anc] - 1
+    else:
+        order = np.lexsort((position, anc_values, ~nan_values, groups))
+        select = anc_offsets[:-1][has_anc]
+
+    prog_indices = np.full(counts.size, -1, dtype=np.int64)
+    prog_indices[has_anc] = anc_indices[order[select]]
+    return prog_indices
+
 def max_field_value(ancestors, field):
     r"""
     Return the TreeNode with the maximum value of the given field.
@@ -103,8 +161,28 @@ def max_field_value(ancestors, field):
     vals = np.array([a[field] for a in ancestors])
     return ancestors[np.argmax(vals)]
 
+def batch_max_field_value(root_node, field):
+    r"""
+    Return the tree_ids of the ancestors with the maximum value of
+    the given field for all nodes in a tree.
+
+    Parameters
+    ----------
+    root_node : TreeNode object
+        The root of the tree.
+    field : string
+        Field to be used for selection.
 
-add_tree_node_selector("max_field_value", max_field_value)
+    Returns
+    -------
+    int64 array
+
+    """
+    return _select_field_value(root_node, field, True)
+
+
+add_tree_node_selector("max_field_value", max_field_value,
+                       batch_function=batch_max_field_value)
 
 def min_field_value(ancestors, field):
     r"""
@@ -126,5 +204,25 @@ def min_field_value(ancestors, field):
     vals = np.array([a[field] for a in ancestors])
     return ancestors[np.argmin(vals)]
 
+def batch_min_field_value(root_node, field):
+    r"""
+    Return the tree_ids of the ancestors with the minimum value of
+    the given field for all nodes in a tree.
+
+    Parameters
+    ----------
+    root_node : TreeNode object
+        The root of the tree.
+    field : string
+        Field to be used for selection.
+
+    Returns
+    -------
+    int64 array
+
+    """
+    return _select_field_value(root_node, field, False)
+
 
-add_tree_node_selector("min_field_value", min_field_value)
+add_tree_node_selector("min_field_value", min_field_value,
+                       batch_function=batch_min_field_value)
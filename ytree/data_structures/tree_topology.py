@@ -0,0 +1,171 @@
+"""
+tree topology functions
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) ytree development team. All rights reserved.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+
+def get_descendent_indices(uids, desc_uids):
+    """
+    Find the index of each node's descendent from arrays of uids.
+
+    This does a sorted search of all descendent uids at once. If a
+    uid appears more than once, the last instance is used.
+
+    Parameters
+    ----------
+    uids : int64 array
+        The uid of each node.
+    desc_uids : int64 array
+        The uid of each node's descendent.
+
+    Returns
+    -------
+    desc_indices : int64 array
+        Index of the descendent of each node, -1 for nodes
+        whose descendent is not found.
+    """
+
+    order = np.argsort(uids, kind="stable")
+    suids = uids[order]
+    isort = np.searchsorted(suids, desc_uids, side="right") - 1
+    found = isort >= 0
+    found[found] = suids[isort[found]] == desc_uids[found]
+
+    desc_indices = np.full(desc_uids.size, -1, dtype=np.int64)
+    desc_indices[found] = order[isort[found]]
+    return desc_indices
+
+def get_ancestor_arrays(desc_indices):
+    """
+    Build compressed ancestor arrays from an array of descendent indices.
+
+    The ancestors of the node with index i are given by
+    anc_indices[anc_offsets[i]:anc_offsets[i+1]].
+
+    Ancestors stored after their descendent are listed before those
+    stored ahead of it, each group in storage order.
+
+    Parameters
+    ----------
+    desc_indices : int64 array
+        Index of the descendent of each node, -1 for nodes
+        with no descendent.
+
+    Returns
+    -------
+    anc_offsets : int64 array
+        Start of each node's ancestor list, with one extra
+        element for the end of the last list.
+    anc_indices : int64 array
+        Indices of ancestors grouped by descendent.
+    """
+
+    size = desc_indices.size
+    nodes = np.where(desc_indices >= 0)[0]
+    descs = desc_indices[nodes]
+    order = np.lexsort((nodes < descs, descs))
+    anc_indices = nodes[order].astype(np.int64)
+
+    anc_offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(descs, minlength=size), out=anc_offsets[1:])
+
+    return anc_offsets, anc_indices
+
+def _get_ancestor_groups(nodes, anc_offsets, anc_indices):
+    """
+    Get the ancestors of an array of nodes in a single array.
+
+    Ancestors are grouped by descendent in the order of the
+    provided nodes.
+
+    Returns
+    -------
+    ancestors : int64 array
+        Indices of all ancestors of the given nodes.
+    counts : int64 array
+        Number of ancestors for each of the given nodes.
+    """
+
+    starts = anc_offsets[nodes]
+    counts = anc_offsets[nodes+1] - starts
+    first = np.cumsum(counts) - counts
+    ianc = np.arange(counts.sum()) + np.repeat(starts - first, counts)
+    return anc_indices[ianc], counts
+
+def get_tree_order(desc_indices, anc_offsets, anc_indices):
+    """
+    Compute a depth-first ordering of all nodes.
+
+    Nodes are ordered such that each node is followed by all of its
+    ancestors, their ancestors, etc., visiting ancestors in the order
+    of the ancestor arrays. This is the same order in which
+    TreeNode._tree_nodes walks the tree. The tree beneath any node is
+    then given by tree_order[tree_start[i]:tree_end[i]].
+
+    Parameters
+    ----------
+    desc_indices : int64 array
+        Index of the descendent of each node, -1 for nodes
+        with no descendent.
+    anc_offsets, anc_indices : int64 arrays
+        Compressed ancestor arrays from get_ancestor_arrays.
+
+    Returns
+    -------
+    tree_order : int64 array
+        Node indices in depth-first order.
+    tree_start : int64 array
+        Position of each node in tree_order.
+    tree_end : int64 array
+        End of the range of positions in tree_order occupied
+        by the tree beneath each node.
+    """
+
+    size = desc_indices.size
+
+    # Walk the generations from the roots outward.
+    roots = np.where(desc_indices < 0)[0]
+    levels = []
+    nodes = roots
+    while nodes.size > 0:
+        ancestors, counts = \
+          _get_ancestor_groups(nodes, anc_offsets, anc_indices)
+        levels.append((nodes, ancestors, counts))
+        nodes = ancestors
+
+    # Count the nodes beneath each node, from the leaves inward.
+    tree_size = np.ones(size, dtype=np.int64)
+    for nodes, ancestors, counts in levels[::-1]:
+        np.add.at(tree_size, desc_indices[ancestors], tree_size[ancestors])
+
+    # Place each ancestor after its descendent and the trees of
+    # its preceding siblings.
+    tree_start = np.full(size, -1, dtype=np.int64)
+    tree_start[roots] = np.cumsum(tree_size[roots]) - tree_size[roots]
+    for nodes, ancestors, counts in levels:
+        asize = tree_size[ancestors]
+        offset = np.cumsum(asize) - asize
+        group_offset = np.concatenate([[0], np.cumsum(asize)])[
+            np.cumsum(counts) - counts]
+        offset -= np.repeat(group_offset, counts)
+        tree_start[ancestors] = \
+          np.repeat(tree_start[nodes] + 1, counts) + offset
+
+    visited = tree_start >= 0
+    tree_order = np.empty(visited.sum(), dtype=np.int64)
+    tree_order[tree_start[visited]] = np.where(visited)[0]
+    tree_end = tree_start + tree_size
+    tree_end[~visited] = -1
+
+    return tree_order, tree_start, tree_end
@@ -13,11 +13,15 @@ AHFArbor class and member functions
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
-from collections import defaultdict
+from concurrent.futures import \
+    ThreadPoolExecutor
 import glob
+import numpy as np
 import os
 import re
 
+from ytree.config import \
+    ytreecfg
 from ytree.data_structures.arbor import \
     CatalogArbor
 from ytree.frontends.ahf.fields import \
@@ -27,11 +31,10 @@ from ytree.frontends.ahf.io import \
     AHFDataFile, \
     AHFNewDataFile
 from ytree.frontends.ahf.misc import \
+    parse_AHF_crm, \
     parse_AHF_file
 from unyt.unit_registry import \
     UnitRegistry
-from ytree.utilities.io import \
-    f_text_block
 
 class AHFArbor(CatalogArbor):
     """
@@ -151,6 +154,29 @@ class AHFArbor(CatalogArbor):
         self.data_files[-1].mtree_filename = None
         self.data_files.reverse()
 
+    def _plant_trees(self):
+        if self.is_planted:
+            return
+
+        self._compute_all_links()
+        super()._plant_trees()
+
+    def _compute_all_links(self):
+        """
+        Compute descendent links for all data files at once.
+
+        Links are otherwise computed for each data file as needed.
+        This is only done if the plant_threads config option is
+        greater than 1, in which case files are read in parallel.
+        """
+
+        nthreads = ytreecfg["ytree"].getint("plant_threads", fallback=1)
+        if nthreads <= 1:
+            return
+
+        with ThreadPoolExecutor(max_workers=nthreads) as executor:
+            list(executor.map(lambda df: df.links, self.data_files))
+
     def _get_file_index(self, f):
         reg = self._file_pattern.search(f)
         if not reg:
@@ -193,42 +219,33 @@ class AHFNewArbor(AHFArbor):
             self.filename = pfns[-1]
         self._crm_filename = self._get_crm_filename(self.filename)
 
-    def _plant_trees(self):
-        if self.is_planted:
-            return
-
+    def _compute_all_links(self):
         self._compute_links()
-        super()._plant_trees()
 
     def _compute_links(self):
         """
-        Read the CRMratio2 file and hand out a dictionary of
-        uid: desc_uid for each data file.
+        Read the CRMratio2 file and hand out arrays of
+        prog_id and desc_id for each data file.
         """
 
-        links = defaultdict(dict)
-
-        f = open(self._crm_filename, mode="r")
-        for i in range(3):
-            f.readline()
-
-        for line, loc in f_text_block(f, pbar_string="Computing links"):
-            if line.startswith("END"):
-                break
+        ids, descids = parse_AHF_crm(self._crm_filename)
 
-            online = line.split()
-            thing = online[0]
-            if len(online) == 2:
-                my_descid = int(thing)
-                continue
-
-            my_id = int(thing)
-            cid = int(thing[:-12])
-            links[cid][my_id] = my_descid
-        f.close()
+        # Sort by id, keeping the last entry for any repeated id.
+        order = np.argsort(ids, kind="stable")
+        ids = ids[order]
+        last = np.append(
+            np.where(ids[1:] != ids[:-1])[0], ids.size - 1)
+        ids = ids[last]
+        descids = descids[order][last]
 
+        # The catalog index is given by all but the last 12 digits.
+        cids = ids // 10**12
         for df in self.data_files:
-            df._links = links[df._catalog_index]
+            my_slice = slice(
+                *np.searchsorted(cids, [df._catalog_index,
+                                        df._catalog_index + 1]))
+            df._links = {"prog_id": ids[my_slice],
+                         "desc_id": descids[my_slice]}
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
@@ -20,7 +20,8 @@ import re
 import weakref
 
 from ytree.frontends.ahf.misc import \
-    parse_AHF_file
+    parse_AHF_file, \
+    parse_AHF_mtree
 from ytree.data_structures.io import \
     CatalogDataFile
 from ytree.utilities.io import \
@@ -129,13 +130,16 @@ class AHFDataFile(CatalogDataFile):
 
         m = data["shared"]**2 / (data["prog_part"] * data["desc_part"])
 
-        progids = np.unique(data["prog_id"])
-        descids = np.empty(progids.size, dtype=progids.dtype)
-
-        for i, progid in enumerate(progids):
-            prf = data["prog_id"] == progid
-            descids[i] = data["desc_id"][prf][m[prf].argmax()]
-        udata = {"prog_id": progids, "desc_id": descids}
+        # Sort by progenitor id, then by merit, then by reverse
+        # position in the file. The last entry for each progenitor
+        # is then the first descendent with the highest merit.
+        order = np.lexsort(
+            (-np.arange(m.size), m, data["prog_id"]))
+        progids = data["prog_id"][order]
+        last = np.append(
+            np.where(progids[1:] != progids[:-1])[0], progids.size - 1)
+        udata = {"prog_id": progids[last],
+                 "desc_id": data["desc_id"][order][last]}
 
         self._links = udata
 
@@ -147,80 +151,15 @@ class AHFDataFile(CatalogDataFile):
         if self.mtree_filename is None:
             return None
 
-        data = defaultdict(list)
-        descid = descpart = None
-
-        f = open(self.mtree_filename, "r")
-        for line, offset in f_text_block(f):
-            if line.startswith("#"):
-                continue
-            if line[0].isdigit():
-                oline = line.split()
-                descid = int(oline[0])
-                descpart = int(oline[1])
-            else:
-                oline = line.split()
-                data["shared"].append(int(oline[0]))
-                data["prog_id"].append(int(oline[1]))
-                data["prog_part"].append(int(oline[2]))
-                data["desc_id"].append(descid)
-                data["desc_part"].append(descpart)
-        f.close()
-
-        if not data:
-            return None
-
-        for field in data:
-            data[field] = np.array(data[field])
-        return data
+        return parse_AHF_mtree(self.mtree_filename)
 
     def _read_data_default(self, rfields, dtypes):
-        if not rfields:
-            return {}
-
-        fi = self.arbor.field_info
-        field_data = self._create_field_arrays(rfields, dtypes)
-        offsets = []
-
-        self.open()
-        f = self.fh
-        f.seek(self._hoffset)
-        file_size = self.file_size - self._hoffset
-        for line, offset in f_text_block(f, file_size=file_size):
-            offsets.append(offset)
-            sline = line.split()
-            for field in rfields:
-                dtype = dtypes[field]
-                field_data[field].append(dtype(sline[fi[field]["column"]]))
-        self.close()
-
-        if self.offsets is None:
-            self.offsets = np.array(offsets)
-
-        return field_data
+        return self._read_text_default(
+            self.halos_filename, rfields, dtypes)
 
     def _read_data_select(self, rfields, tree_nodes, dtypes):
-        if not rfields:
-            return {}
-
-        fi = self.arbor.field_info
-        nt = len(tree_nodes)
-        field_data = self._create_field_arrays(
-            rfields, dtypes, size=nt)
-
-        self.open()
-        f = self.fh
-
-        for i in range(nt):
-            f.seek(self.offsets[tree_nodes[i]._fi])
-            line = f.readline()
-            sline = line.split()
-            for field in rfields:
-                dtype = dtypes[field]
-                field_data[field][i] = dtype(sline[fi[field]["column"]])
-        self.close()
-
-        return field_data
+        return self._read_text_select(
+            self.halos_filename, rfields, tree_nodes, dtypes)
 
     def _get_mtree_fields(self, tfields, dtypes, field_data):
         """
@@ -235,16 +174,16 @@ class AHFDataFile(CatalogDataFile):
             len(field_data["ID"]),
             dtype=dtypes['desc_id'])
 
-        if self.links == -1:
+        if isinstance(links, int) or links["prog_id"].size == 0:
             descids[:] = -1
         else:
-            for i, hid in enumerate(field_data["ID"]):
-                inlink = hid == links["prog_id"]
-                if not inlink.any():
-                    descids[i] = -1
-                else:
-                    descids[i] = \
-                      links["desc_id"][np.where(inlink)[0][0]]
+            # progenitor ids are sorted, so look them up with a search
+            hids = np.asarray(field_data["ID"])
+            progids = links["prog_id"]
+            ilink = np.searchsorted(progids, hids)
+            ilink[ilink >= progids.size] = 0
+            found = progids[ilink] == hids
+            descids[:] = np.where(found, links["desc_id"][ilink], -1)
 
         field_data["desc_id"] = descids
 
@@ -305,19 +244,4 @@ class AHFNewDataFile(AHFDataFile):
         Read the CRMratio2 file.
         """
 
-    def _compute_links(self):
         self.arbor._compute_links()
-
-    def _get_mtree_fields(self, tfields, dtypes, field_data):
-        if not tfields:
-            return
-
-        my_ids = field_data["ID"]
-        field_data["desc_id"] = descids = np.full(
-            len(my_ids), -1, dtype=dtypes["desc_id"])
-
-        if not self.links:
-            return
-
-        for i in range(descids.size):
-            descids[i] = self.links.get(my_ids[i], -1)
@@ -13,6 +13,18 @@ AHFArbor miscellany
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+import mmap
+import numpy as np
+import os
+
+from ytree.utilities.io import \
+    parse_text_columns, \
+    read_text_ranges
+
+# lookup table of whitespace characters
+_whitespace = np.zeros(256, dtype=bool)
+_whitespace[np.frombuffer(b" \t\r\n\v\f", dtype=np.uint8)] = True
+
 def parse_AHF_file(filename, pars, sep=None):
     """
     Parse an AHF log or parameter file.
@@ -42,3 +54,145 @@ def parse_AHF_file(filename, pars, sep=None):
         raise RuntimeError(f"{filename} missing these parameters: {mpars}.")
 
     return vals
+
+def _get_text_lines(filename, block_size=16777216):
+    """
+    Find the lines of a text file.
+
+    Returns the start and end (including the newline) byte offsets
+    of each line, its first character, and the number of
+    whitespace-separated tokens on it. The file is scanned in blocks
+    of block_size bytes to keep temporary arrays small.
+    """
+
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.uint8), empty
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        data = np.frombuffer(mm, dtype=np.uint8)
+        blocks = range(0, data.size, block_size)
+        newlines = np.concatenate(
+            [np.flatnonzero(data[i:i+block_size] == ord("\n")) + i
+             for i in blocks])
+        starts = np.concatenate([[0], newlines + 1])
+        ends = np.concatenate([newlines + 1, [data.size]])
+        if starts[-1] == data.size:
+            starts = starts[:-1]
+            ends = ends[:-1]
+        first = data[starts]
+
+        # count the places where a token begins on each line,
+        # carrying whether the last character was a space
+        ntokens = np.zeros(starts.size, dtype=np.int64)
+        last_space = True
+        for i in blocks:
+            space = _whitespace[data[i:i+block_size]]
+            tstart = ~space
+            tstart[0] &= last_space
+            tstart[1:] &= space[:-1]
+            last_space = space[-1]
+            positions = np.flatnonzero(tstart) + i
+            if positions.size == 0:
+                continue
+            lines = np.searchsorted(starts, positions, side="right") - 1
+            ntokens[lines[0]:lines[-1]+1] += np.bincount(lines - lines[0])
+    finally:
+        # views of the map must be gone before it can be closed
+        data = None
+        mm.close()
+
+    return starts, ends, first, ntokens
+
+def _get_descendent_indices(filename, desc, prog):
+    """
+    Get the index of the descendent of each progenitor line,
+    i.e., the last descendent line before it.
+    """
+
+    idesc = np.searchsorted(
+        np.where(desc)[0], np.where(prog)[0]) - 1
+    if (idesc < 0).any():
+        raise RuntimeError(
+            f"{filename} has progenitors before the first descendent.")
+    return idesc
+
+def _read_lines(filename, starts, ends, fields, dtypes):
+    """
+    Read the first few columns of a set of lines.
+    """
+
+    text = read_text_ranges(filename, starts, ends)
+    columns = dict((field, i) for i, field in enumerate(fields))
+    return parse_text_columns(text, fields, columns, dtypes)
+
+def parse_AHF_mtree(filename):
+    """
+    Parse an AHF_mtree file.
+
+    These have a line for each descendent with its id and number
+    of particles, followed by an indented line for each of its
+    progenitors with the number of shared particles and the
+    progenitor's id and number of particles. All lines are parsed
+    at once. Returns None if there are no progenitors.
+    """
+
+    starts, ends, first, ntokens = _get_text_lines(filename)
+
+    desc = (first >= ord("0")) & (first <= ord("9"))
+    prog = ~desc & (first != ord("#")) & (ntokens > 0)
+    if not prog.any():
+        return None
+
+    fields = ["shared", "prog_id", "prog_part", "desc_id", "desc_part"]
+    dtypes = dict((field, np.int64) for field in fields)
+    data = _read_lines(
+        filename, starts[prog], ends[prog], fields[:3], dtypes)
+    ddata = _read_lines(
+        filename, starts[desc], ends[desc], fields[3:], dtypes)
+
+    idesc = _get_descendent_indices(filename, desc, prog)
+    for field in fields[3:]:
+        data[field] = ddata[field][idesc]
+    return data
+
+def parse_AHF_crm(filename):
+    """
+    Parse an AHF MergerTree CRMratio2 file.
+
+    After three header lines, these have a line with the id and
+    number of progenitors of each descendent, followed by a line
+    for each progenitor starting with its id. The file ends with
+    a line starting with "END". All lines are parsed at once.
+
+    Returns
+    -------
+    ids : array of ints
+        The id of each progenitor.
+    descids : array of ints
+        The id of the descendent of each progenitor.
+    """
+
+    starts, ends, first, ntokens = \
+      [arr[3:] for arr in _get_text_lines(filename)]
+
+    # stop at the first line starting with END
+    with open(filename, "rb") as f:
+        for i in np.where(first == ord("E"))[0]:
+            f.seek(starts[i])
+            if f.read(3) == b"END":
+                starts, ends, ntokens = \
+                  starts[:i], ends[:i], ntokens[:i]
+                break
+
+    desc = ntokens == 2
+    prog = ~desc & (ntokens > 0)
+    dtypes = {"id": np.int64}
+    ids = _read_lines(
+        filename, starts[prog], ends[prog], ["id"], dtypes)["id"]
+    descids = _read_lines(
+        filename, starts[desc], ends[desc], ["id"], dtypes)["id"]
+
+    idesc = _get_descendent_indices(filename, desc, prog)
+    return ids, descids[idesc]
@@ -21,6 +21,8 @@ import os
 from yt.funcs import \
     get_pbar
 
+from ytree.config import \
+    ytreecfg
 from ytree.data_structures.arbor import \
     SegmentedArbor
 
@@ -31,6 +33,7 @@ from ytree.frontends.consistent_trees.io import \
     ConsistentTreesTreeFieldIO, \
     ConsistentTreesHlistDataFile
 from ytree.frontends.consistent_trees.utilities import \
+    find_tree_headers, \
     parse_ctrees_header
 from ytree.frontends.rockstar.arbor import \
     RockstarArbor
@@ -67,46 +70,22 @@ class ConsistentTreesArbor(SegmentedArbor):
     def _plant_trees(self):
         if self.is_planted or self._size == 0:
             return
-
-        lkey = len("tree ")+1
-        block_size = 4096
+        if self._load_plant_cache():
+            return
 
         data_file = self.data_files[0]
-
-        data_file.open()
-        data_file.fh.seek(0, 2)
-        file_size = data_file.fh.tell()
-        pbar = get_pbar("Loading tree roots", file_size)
-        data_file.fh.seek(self._hoffset)
-
-        offset = self._hoffset
-        itree = 0
-        nblocks = np.ceil(float(file_size-self._hoffset) /
-                          block_size).astype(np.int64)
-        for ib in range(nblocks):
-            my_block = min(block_size, file_size - offset)
-            if my_block <= 0: break
-            buff = data_file.fh.read(my_block)
-            lihash = -1
-            for ih in range(buff.count("#")):
-                ihash = buff.find("#", lihash+1)
-                inl = buff.find("\n", ihash+1)
-                if inl < 0:
-                    buff += data_file.fh.readline()
-                    inl = len(buff)
-                uid = int(buff[ihash+lkey:inl])
-                self._node_info['uid'][itree] = uid
-                lihash = ihash
-                self._node_info['_si'][itree] = offset + inl + 1
-                self._node_info['_fi'][itree] = 0
-                if itree > 0:
-                    self._node_info['_ei'][itree-1] = offset + ihash - 1
-                itree += 1
-            offset = data_file.fh.tell()
-            pbar.update(offset)
-        self._node_info['_ei'][-1] = offset
-        data_file.close()
-        pbar.finish()
+        nthreads = ytreecfg["ytree"].getint("plant_threads", fallback=1)
+        hashes, newlines, uids, file_size = find_tree_headers(
+            data_file.filename, offset=self._hoffset, nthreads=nthreads)
+
+        self._node_info['uid'][:] = uids
+        self._node_info['_fi'][:] = 0
+        # data starts after each header line
+        self._node_info['_si'][:] = newlines + 1
+        # and ends at the newline before the next header
+        self._node_info['_ei'][:-1] = hashes[1:] - 1
+        self._node_info['_ei'][-1] = file_size
+        self._save_plant_cache()
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
@@ -147,9 +126,32 @@ class ConsistentTreesGroupArbor(ConsistentTreesArbor):
         fn = os.path.join(self.directory, line.split()[3])
         super()._parse_parameter_file(filename=fn, ntrees_in_file=False)
 
+    def _get_plant_cache_files(self):
+        # Tree offsets point into the tree files, so they must
+        # be checked, too.
+        with open(self.filename, 'r') as f:
+            f.seek(self._hoffset)
+            dfns = set(line.split()[3] for line in f if line.strip())
+        return [self.filename] + \
+          [os.path.join(self.directory, fn) for fn in sorted(dfns)]
+
+    def _get_plant_cache_state(self):
+        return {"data_files":
+                np.array(["" if data_file is None
+                          else os.path.basename(data_file.filename)
+                          for data_file in self.data_files])}
+
+    def _set_plant_cache_state(self, state):
+        self.data_files = \
+          [None if not fn
+           else ConsistentTreesDataFile(os.path.join(self.directory, fn))
+           for fn in state["data_files"]]
+
     def _plant_trees(self):
         if self.is_planted:
             return
+        if self._load_plant_cache():
+            return
 
         f = open(self.filename, 'r')
         f.seek(self._hoffset)
@@ -205,6 +207,7 @@ class ConsistentTreesGroupArbor(ConsistentTreesArbor):
             data_file.fh.seek(0, 2)
             self._node_info['_ei'][i] = data_file.fh.tell()
             data_file.close()
+        self._save_plant_cache()
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
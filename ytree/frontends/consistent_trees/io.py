@@ -16,11 +16,23 @@ ConsistentTreesArbor io classes and member functions
 import numpy as np
 import os
 
+from yt.funcs import \
+    get_pbar
+
 from ytree.data_structures.io import \
     DataFile, \
     TreeFieldIO
+from ytree.frontends.consistent_trees.utilities import \
+    count_lines
 from ytree.frontends.rockstar.io import \
     RockstarDataFile
+from ytree.utilities.cache import \
+    get_column_cache, \
+    ColumnCache
+from ytree.utilities.io import \
+    parse_text_columns
+from ytree.utilities.logger import \
+    ytreeLogger as mylog
 
 class ConsistentTreesDataFile(DataFile):
     def open(self):
@@ -40,40 +52,152 @@ class ConsistentTreesTreeFieldIO(TreeFieldIO):
         my_dtypes = self._determine_dtypes(
             fields, override_dict=dtypes)
 
-        close = False
-        if data_file.fh is None:
-            close = True
-            data_file.open()
-        fh = data_file.fh
-        fh.seek(root_node._si)
-        if root_only:
-            data = [fh.readline()]
-        else:
-            data = fh.read(
-                root_node._ei -
-                root_node._si).split("\n")
-            if len(data[-1]) == 0:
-                data.pop()
-        if close:
-            data_file.close()
-
-        nhalos = len(data)
-        field_data = {}
         fi = self.arbor.field_info
-        for field in fields:
-            field_data[field] = np.empty(nhalos, dtype=my_dtypes[field])
-
-        for i, datum in enumerate(data):
-            ldata = datum.strip().split()
-            if len(ldata) == 0: continue
-            for field in fields:
-                dtype = my_dtypes[field]
-                field_data[field][i] = dtype(ldata[fi[field]["column"]])
+        columns = dict((field, fi[field]["column"]) for field in fields)
+
+        field_data = None
+        cache = get_column_cache(data_file.filename)
+        if cache is not None:
+            field_data = self._read_cached_fields(
+                root_node, cache, fields, columns, my_dtypes,
+                root_only=root_only)
+
+        if field_data is None:
+            close = False
+            if data_file.fh is None:
+                close = True
+                data_file.open()
+            fh = data_file.fh
+            fh.seek(root_node._si)
+            if root_only:
+                data = fh.readline()
+            else:
+                data = fh.read(root_node._ei - root_node._si)
+            if close:
+                data_file.close()
+
+            field_data = parse_text_columns(
+                data, fields, columns, my_dtypes)
 
         self._apply_units(fields, field_data)
 
         return field_data
 
+    def _read_cached_fields(self, root_node, cache, fields, columns,
+                            dtypes, root_only=False, create=True):
+        """
+        Read fields for a single tree from the column cache.
+
+        If create is True, columns not yet cached are first parsed
+        from the whole file. Returns None if they cannot be cached.
+        """
+
+        names = dict((field, ColumnCache.column_name(
+            columns[field], dtypes[field])) for field in fields)
+        field_data = dict((field, cache.get(names[field]))
+                          for field in fields)
+        tree_offsets = cache.get("tree_offsets")
+        row_offsets = cache.get("row_offsets")
+
+        missing = [field for field in fields if field_data[field] is None]
+        if missing or tree_offsets is None or row_offsets is None:
+            if not create or \
+              not self._cache_fields(root_node._fi, cache, missing,
+                                     columns, dtypes):
+                return None
+            return self._read_cached_fields(
+                root_node, cache, fields, columns, dtypes,
+                root_only=root_only, create=False)
+
+        itree = tree_offsets.searchsorted(root_node._si)
+        start = row_offsets[itree]
+        if root_only:
+            end = start + 1
+        else:
+            end = row_offsets[itree + 1]
+
+        return dict((field, np.array(field_data[field][start:end]))
+                    for field in fields)
+
+    def _cache_fields(self, ifile, cache, fields, columns, dtypes,
+                      block_size=16777216):
+        """
+        Parse fields for all trees in a file and save them to the
+        column cache, along with the starting row of each tree.
+
+        Trees are parsed in blocks of about block_size bytes and
+        written to memory-mapped arrays, so the whole file is never
+        held in memory.
+        """
+
+        data_file = self.arbor.data_files[ifile]
+        node_info = self.arbor._node_info
+        my_trees = node_info["_fi"] == ifile
+        starts = node_info["_si"][my_trees]
+        ends = node_info["_ei"][my_trees]
+        order = starts.argsort()
+        starts = starts[order]
+        ends = ends[order]
+
+        tree_offsets = cache.get("tree_offsets")
+        row_offsets = cache.get("row_offsets")
+        if tree_offsets is None or row_offsets is None or \
+          tree_offsets.size != starts.size:
+            counts = count_lines(data_file.filename, starts, ends,
+                                 block_size=block_size)
+            row_offsets = np.concatenate([[0], counts.cumsum()])
+            cache.save("tree_offsets", starts)
+            cache.save("row_offsets", row_offsets)
+
+        if not fields:
+            return True
+
+        mylog.info(f"Caching {len(fields)} columns from "
+                   f"{data_file.filename} to {cache}.")
+
+        names = dict((field, ColumnCache.column_name(
+            columns[field], dtypes[field])) for field in fields)
+        arrays = {}
+        for field in fields:
+            name = names[field]
+            if name in arrays:
+                continue
+            data = cache.create(name, row_offsets[-1], dtypes[field])
+            if data is None:
+                break
+            arrays[name] = data
+
+        success = len(arrays) == len(set(names.values()))
+        pbar = get_pbar("Caching columns", ends[-1] - starts[0])
+        with open(data_file.filename, "rb") as f:
+            i = 0
+            while success and i < starts.size:
+                j = max(starts.searchsorted(starts[i] + block_size), i + 1)
+                f.seek(starts[i])
+                text = f.read(ends[j-1] - starts[i]).decode()
+                block_data = parse_text_columns(
+                    text, fields, columns, dtypes)
+
+                rstart = row_offsets[i]
+                rend = row_offsets[j]
+                for field in fields:
+                    if block_data[field].size != rend - rstart:
+                        success = False
+                        break
+                    arrays[names[field]][rstart:rend] = block_data[field]
+                pbar.update(ends[j-1] - starts[0])
+                i = j
+        pbar.finish()
+
+        for name, data in arrays.items():
+            if success:
+                cache.commit(name, data)
+            else:
+                cache.discard(name)
+        if not success:
+            mylog.warning(f"Could not cache columns from {data_file.filename}.")
+        return success
+
 class ConsistentTreesHlistDataFile(RockstarDataFile):
     def _parse_header(self):
         super()._parse_header()
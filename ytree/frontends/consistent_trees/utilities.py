@@ -13,8 +13,15 @@ ConsistentTreesArbor utility functions
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+from concurrent.futures import \
+    ThreadPoolExecutor
+import mmap
+import numpy as np
+import os
 import re
 
+from yt.funcs import \
+    get_pbar
 from unyt.exceptions import \
     UnitParseError
 
@@ -142,3 +149,162 @@ def parse_ctrees_header(arbor, input_stream,
 
     arbor.box_size = arbor.quan(float(box[0]), box[1])
     return fi
+
+def parse_integers(data, starts, ends):
+    """
+    Parse integers from many byte ranges of a uint8 array at once.
+
+    Only the digits in each range are used, so surrounding whitespace
+    is ignored.
+    """
+
+    if starts.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    width = max(int((ends - starts).max()), 1)
+    indices = starts[:, None] + np.arange(width)
+    valid = indices < ends[:, None]
+    np.clip(indices, 0, data.size - 1, out=indices)
+    digits = data[indices].astype(np.int64) - ord("0")
+    valid &= (digits >= 0) & (digits <= 9)
+    digits[~valid] = 0
+    # the power of ten of each digit is the number of digits after it
+    power = np.cumsum(valid[:, ::-1], axis=1)[:, ::-1] - valid
+    return (digits * 10**power).sum(axis=1)
+
+def _find_tree_headers(data, mm, start, end):
+    """
+    Find tree header lines starting within a range of bytes.
+    """
+
+    hashes = start + np.flatnonzero(data[start:end] == ord("#"))
+
+    # Header lines are short, so look for the newline in a small
+    # window after each "#" and fall back to a search if not found.
+    width = 32
+    indices = hashes[:, None] + np.arange(width)
+    np.clip(indices, 0, data.size - 1, out=indices)
+    is_newline = data[indices] == ord("\n")
+    newlines = hashes + is_newline.argmax(axis=1)
+    for i in np.flatnonzero(~is_newline.any(axis=1)):
+        inl = mm.find(b"\n", int(hashes[i]))
+        newlines[i] = data.size if inl < 0 else inl
+
+    uids = parse_integers(data, hashes + len("#tree "), newlines)
+    return hashes, newlines, uids
+
+def find_tree_headers(filename, offset=0, nthreads=1,
+                      block_size=16777216,
+                      pbar_string="Loading tree roots"):
+    """
+    Find all "#tree <uid>" lines in a consistent-trees tree file.
+
+    The file is memory-mapped and searched in blocks of block_size
+    bytes. If nthreads is greater than 1, blocks are searched in
+    multiple threads.
+
+    Parameters
+    ----------
+    filename : string
+        The tree file.
+    offset : optional, int
+        The byte offset at which to start searching.
+        Default: 0.
+    nthreads : optional, int
+        The number of threads to use.
+        Default: 1.
+    block_size : optional, int
+        The number of bytes to search at a time.
+        Default: 16 MB.
+    pbar_string : optional, string
+        The progress bar label.
+
+    Returns
+    -------
+    hashes : array of ints
+        The byte offset of each header line.
+    newlines : array of ints
+        The byte offset of the newline ending each header line.
+    uids : array of ints
+        The uid of each tree.
+    file_size : int
+        The size of the file in bytes.
+    """
+
+    with open(filename, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size <= offset:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, file_size
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    starts = range(offset, file_size, block_size)
+    pbar = get_pbar(pbar_string, file_size)
+    try:
+        data = np.frombuffer(mm, dtype=np.uint8)
+
+        def search(start):
+            return _find_tree_headers(
+                data, mm, start, min(start + block_size, file_size))
+
+        if nthreads > 1 and len(starts) > 1:
+            executor = ThreadPoolExecutor(max_workers=nthreads)
+            results = executor.map(search, starts)
+        else:
+            executor = None
+            results = map(search, starts)
+
+        blocks = []
+        for start, result in zip(starts, results):
+            blocks.append(result)
+            pbar.update(min(start + block_size, file_size))
+        if executor is not None:
+            executor.shutdown()
+        pbar.finish()
+    finally:
+        # views of the map must be gone before it can be closed
+        data = search = None
+        mm.close()
+
+    hashes, newlines, uids = \
+      [np.concatenate(arrs) for arrs in zip(*blocks)]
+    return hashes, newlines, uids, file_size
+
+def count_lines(filename, starts, ends, block_size=16777216):
+    """
+    Count the lines in many sorted, non-overlapping byte ranges
+    of a file.
+
+    A final line with no newline at the end of a range is counted.
+    """
+
+    counts = np.zeros(starts.size, dtype=np.int64)
+    if starts.size == 0:
+        return counts
+
+    with open(filename, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        data = np.frombuffer(mm, dtype=np.uint8)
+        i = 0
+        while i < starts.size:
+            # take ranges covering about block_size bytes at a time
+            j = max(starts.searchsorted(starts[i] + block_size), i + 1)
+            my_starts = starts[i:j]
+            my_ends = ends[i:j]
+            lo = my_starts[0]
+            newlines = lo + np.flatnonzero(
+                data[lo:my_ends[-1]] == ord("\n"))
+            counts[i:j] = newlines.searchsorted(my_ends) - \
+              newlines.searchsorted(my_starts)
+            open_end = my_ends > my_starts
+            open_end[open_end] = \
+              data[my_ends[open_end] - 1] != ord("\n")
+            counts[i:j] += open_end
+            i = j
+    finally:
+        # views of the map must be gone before it can be closed
+        data = newlines = None
+        mm.close()
+
+    return counts
@@ -27,6 +27,7 @@ from ytree.frontends.consistent_trees.utilities import \
 from ytree.frontends.consistent_trees_hdf5.fields import \
     ConsistentTreesHDF5FieldInfo
 from ytree.frontends.consistent_trees_hdf5.io import \
+    ChunkStore, \
     ConsistentTreesHDF5DataFile, \
     ConsistentTreesHDF5RootFieldIO, \
     ConsistentTreesHDF5TreeFieldIO
@@ -64,11 +65,14 @@ class ConsistentTreesHDF5Arbor(SegmentedArbor):
     _default_dtype = np.float32
     _node_io_attrs = ('_fi', '_si', '_ei')
 
-    def __init__(self, filename, access='tree'):
+    def __init__(self, filename, access='tree', cache_size=4294967296,
+                 chunk_size=262144):
         if access not in _access_names:
             raise ValueError(
                 f"Invalid access value: {access}. Valid options are: {_access_names}.")
         self.access = access
+        self._field_cache = ChunkStore(
+            chunk_size=chunk_size, max_size=cache_size)
         self._node_io_attrs += (_access_names[access]['host_attr'],)
         super().__init__(filename)
 
@@ -76,6 +80,9 @@ class ConsistentTreesHDF5Arbor(SegmentedArbor):
         data_file._field_cache.reset()
         data_file.close()
 
+    def _get_plant_cache_key(self):
+        return (self.access,)
+
     @property
     def _virtual_dataset(self):
         return re.search(r"\_\d+\.h5$", self.parameter_filename) is None
@@ -86,7 +93,9 @@ class ConsistentTreesHDF5Arbor(SegmentedArbor):
         if self._virtual_dataset:
             with h5py.File(self.filename, mode='r') as f:
                 self.data_files = \
-                  [ConsistentTreesHDF5DataFile(self.filename, lname) for lname in f]
+                  [ConsistentTreesHDF5DataFile(
+                    self.filename, lname, field_cache=self._field_cache)
+                   for lname in f]
                 self._file_count = \
                   np.array([f[lname].attrs[aname] for lname in f])
         else:
@@ -94,7 +103,8 @@ class ConsistentTreesHDF5Arbor(SegmentedArbor):
                 fns = [self.filename]
             else:
                 fns = self.filename
-            self.data_files = [ConsistentTreesHDF5DataFile(fn, None) for fn in fns]
+            self.data_files = [ConsistentTreesHDF5DataFile(
+                fn, None, field_cache=self._field_cache) for fn in fns]
             self._file_count = \
               np.array([h5py.File(fn, mode='r').attrs[aname] for fn in fns])
             self._size = sum(self._file_count)
@@ -164,6 +174,8 @@ class ConsistentTreesHDF5Arbor(SegmentedArbor):
     def _plant_trees(self):
         if self.is_planted or self._size == 0:
             return
+        if self._load_plant_cache():
+            return
 
         my_access  = _access_names[self.access]
         groupname  = my_access['group']
@@ -193,6 +205,7 @@ class ConsistentTreesHDF5Arbor(SegmentedArbor):
             pbar.update(c)
         pbar.finish()
         self._node_info['uid'] = self['uid']
+        self._save_plant_cache()
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
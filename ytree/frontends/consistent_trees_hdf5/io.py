@@ -13,7 +13,9 @@ ConsistentTreesHDF5Arbor io classes and member functions
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
-from collections import defaultdict
+from collections import \
+    defaultdict, \
+    OrderedDict
 import h5py
 import numpy as np
 
@@ -24,36 +26,127 @@ from ytree.data_structures.io import \
     DataFile, \
     DefaultRootFieldIO, \
     TreeFieldIO
+from ytree.utilities.io import \
+    read_hdf5_rows
 
 class ChunkStore:
-    def __init__(self, chunk_size=262144):
+    """
+    Storage for windows of field data while reading trees.
+
+    Each window holds at least chunk_size halos and is aligned to
+    the chunks of the dataset in the file. Many windows of each
+    field are kept, in least-recently-used order, and the oldest
+    are dropped when their total size would exceed max_size bytes.
+    When windows are read in order, more windows are read ahead at
+    once, doubling each time up to max_readahead. For the array of
+    structs layout, windows hold all fields.
+    """
+
+    def __init__(self, chunk_size=262144, max_size=4294967296,
+                 max_readahead=8):
         self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.max_readahead = max_readahead
         self.reset()
 
     def reset(self):
-        self.data = {}
-        self.ind = {}
+        self.data = OrderedDict()
+        self.size = 0
+        self._readahead = {}
 
     def get(self, fh, field, index):
+        """
+        Get a copy of the data for a field over a range of halos.
+        """
+
         start, end = index
-        si, ei = self.ind.get(field, (0, 0))
+        if isinstance(fh, h5py.Dataset):
+            ds = fh
+            column = field
+        else:
+            ds = fh[field]
+            column = None
+
+        wsize = self._get_window_size(ds)
+        first = start // wsize
+        last = max(end - 1, start) // wsize
+        nbytes = (last - first + 1) * wsize * ds.dtype.itemsize
+        if end <= start or nbytes > self.max_size:
+            data = ds[start:end]
+        else:
+            dkey = (ds.file.filename, ds.name)
+            keys = [dkey + (w,) for w in range(first, last + 1)]
+            missing = [w for w, key in enumerate(keys, first)
+                       if key not in self.data]
+            for key in keys:
+                if key in self.data:
+                    self.data.move_to_end(key)
+            if missing:
+                self._load(ds, dkey, missing[0], last + 1, wsize,
+                           nkeep=missing[0] - first)
+            windows = [self.data[key][0] for key in keys]
+            data = np.concatenate(windows) if len(windows) > 1 \
+              else windows[0]
+            offset = start - first * wsize
+            data = data[offset:offset+end-start]
+
+        if column is not None:
+            data = data[column]
+        return data.copy()
+
+    def _get_window_size(self, ds):
+        """
+        Get the smallest multiple of the dataset chunk size that
+        is at least chunk_size.
+        """
 
-        if field not in self.data or ei < end or si > start:
-            si = start
-            ei = start + self.chunk_size
-            self.ind[field] = (si, ei)
-            self.data[field] = fh[field][si:ei]
+        step = 1 if ds.chunks is None else ds.chunks[0]
+        return max(1, -(-self.chunk_size // step)) * step
 
-        data_s = start - si
-        data_e = end - si
-        return self.data[field][data_s:data_e]
+    def _load(self, ds, dkey, first, last, wsize, nkeep=0):
+        """
+        Read a range of windows, plus any to read ahead, making room
+        for them without dropping the nkeep windows just before.
+        """
+
+        # Read ahead if this follows the last range read.
+        nahead, next_window = self._readahead.get(dkey, (0, None))
+        if first == next_window:
+            nahead = min(max(2 * nahead, 1), self.max_readahead)
+        else:
+            nahead = 0
+        wbytes = wsize * ds.dtype.itemsize
+        nahead = max(0, min(
+            nahead, self.max_size // wbytes - (last - first + nkeep)))
+        nwindows = -(-ds.shape[0] // wsize)
+        last = min(last + nahead, nwindows)
+        self._readahead[dkey] = (nahead, last)
+
+        for w in range(first, last):
+            self._remove(dkey + (w,))
+        nbytes = (last - first) * wbytes
+        while self.data and self.size + nbytes > self.max_size:
+            self._remove(next(iter(self.data)))
+
+        data = ds[first*wsize:last*wsize]
+        for w in range(first, last):
+            wdata = data[(w-first)*wsize:(w-first+1)*wsize]
+            self.data[dkey + (w,)] = (wdata, wbytes)
+            self.size += wbytes
+
+    def _remove(self, key):
+        entry = self.data.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
 
 class ConsistentTreesHDF5DataFile(DataFile):
-    def __init__(self, filename, linkname):
+    def __init__(self, filename, linkname, field_cache=None):
         super().__init__(filename)
         self.linkname = linkname
         self.real_fh = None
-        self._field_cache = ChunkStore()
+        if field_cache is None:
+            field_cache = ChunkStore()
+        self._field_cache = field_cache
 
     def open(self):
         self.real_fh = h5py.File(self.filename, mode="r")
@@ -94,8 +187,6 @@ class ConsistentTreesHDF5TreeFieldIO(TreeFieldIO):
 
         if close:
             data_file.close()
-            for field in fields:
-                field_data[field] = field_data[field].copy()
 
         self._apply_units(fields, field_data)
 
@@ -105,9 +196,8 @@ class ConsistentTreesHDF5RootFieldIO(DefaultRootFieldIO):
     """
     Read in fields for first node in all trees/forest.
 
-    This function is optimized for the struct of arrays layout.
-    It will work for array of structs layout, but field access
-    will be 1 to 2 orders of magnitude slower.
+    Only the rows of the roots are read. For the array of structs
+    layout, all fields are read together.
     """
     def _read_fields(self, storage_object, fields, dtypes=None):
         if dtypes is None:
@@ -132,12 +222,17 @@ class ConsistentTreesHDF5RootFieldIO(DefaultRootFieldIO):
             arbor._node_io_loop_start(data_file)
 
             fh = data_file.fh['Forests']
+            max_rows = data_file._field_cache.chunk_size
             if self.arbor._aos:
-                fh = fh['halos']
-
-            for field in fields:
-                darray = fh[field][()]
-                rdata[field].append(darray[my_indices])
+                darray = read_hdf5_rows(fh['halos'], my_indices,
+                                        max_rows=max_rows)
+                for field in fields:
+                    rdata[field].append(darray[field])
+            else:
+                for field in fields:
+                    rdata[field].append(
+                        read_hdf5_rows(fh[field], my_indices,
+                                       max_rows=max_rows))
 
             arbor._node_io_loop_finish(data_file)
 
@@ -27,7 +27,8 @@ from ytree.frontends.gadget4.fields import \
     Gadget4FieldInfo
 from ytree.frontends.gadget4.io import \
     Gadget4DataFile, \
-    Gadget4TreeFieldIO
+    Gadget4TreeFieldIO, \
+    Gadget4TreeStore
 
 class Gadget4Arbor(SegmentedArbor):
     """
@@ -40,6 +41,26 @@ class Gadget4Arbor(SegmentedArbor):
     _tree_field_io_class = Gadget4TreeFieldIO
     _node_io_attrs = ("_fi", "_si", "_fei", "_ei")
 
+    def _node_io_loop_prepare(self, nodes):
+        (fi, si, fei, ei), ufi, index_list, return_order = \
+          self._group_node_file_indices(nodes, attrs=self._node_io_attrs)
+        data_files = [self.data_files[i] for i in ufi]
+
+        # Give each data file the trees to be read from it so that
+        # field data can be read for many trees at once. Trees
+        # continuing into the next file are read separately.
+        for data_file, indices in zip(data_files, index_list):
+            indices = indices[fei[indices] == fi[indices]]
+            if indices.size == 0:
+                continue
+            data_file._tree_store = \
+              Gadget4TreeStore(data_file, si[indices], ei[indices])
+        return data_files, index_list, return_order
+
+    def _node_io_loop_finish(self, data_file):
+        data_file._tree_store = None
+        super()._node_io_loop_finish(data_file)
+
     def _get_data_files(self):
         if self._nfiles == 1:
             files = [self.parameter_filename]
@@ -95,6 +116,8 @@ class Gadget4Arbor(SegmentedArbor):
     def _plant_trees(self):
         if self.is_planted or self._size == 0:
             return
+        if self._load_plant_cache():
+            return
 
         istart = 0
         file_sizes = np.empty(len(self.data_files), dtype=int)
@@ -126,6 +149,7 @@ class Gadget4Arbor(SegmentedArbor):
         self._node_info["_ei"] = offset + tree_size - file_start_offset[file_end_index]
         self._node_info["uid"] = offset
         pbar.finish()
+        self._save_plant_cache()
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
@@ -20,9 +20,61 @@ import re
 from ytree.data_structures.io import \
     DataFile, \
     TreeFieldIO
+from ytree.utilities.io import \
+    read_hdf5_rows
+
+class Gadget4TreeStore:
+    """
+    Field data for a set of trees in a single data file.
+
+    The trees are split into chunks spanning roughly chunk_size
+    halos. When a field is needed for one tree, it is read for the
+    whole chunk at once. When only the root is needed, the field is
+    read for the roots of all trees at once.
+    """
+
+    def __init__(self, data_file, starts, ends, chunk_size=1048576):
+        self.data_file = data_file
+        # start and end indices of the trees within the data file
+        self.starts, indices = np.unique(starts, return_index=True)
+        self.ends = np.asarray(ends)[indices]
+        chunk_ids = (self.starts - self.starts[0]) // chunk_size
+        self._chunk_bounds = np.concatenate(
+            [[0], np.where(np.diff(chunk_ids) > 0)[0] + 1,
+             [self.starts.size]])
+        self._chunk = None
+        self._data = {}
+        self._root_data = {}
+
+    def __contains__(self, start):
+        i = np.searchsorted(self.starts, start)
+        return i < self.starts.size and self.starts[i] == start
+
+    def get_field(self, field, start, root_only=False):
+        """
+        Get a field for the tree starting at a given index.
+        """
+
+        g = self.data_file.fh["TreeHalos"]
+        i = np.searchsorted(self.starts, start)
+        if root_only:
+            if field not in self._root_data:
+                self._root_data[field] = read_hdf5_rows(g[field], self.starts)
+            return self._root_data[field][i:i+1].copy()
+
+        ichunk = np.digitize(i, self._chunk_bounds) - 1
+        if ichunk != self._chunk:
+            self._chunk = ichunk
+            self._data.clear()
+        cstart, cend = self._chunk_bounds[ichunk:ichunk+2]
+        base = self.starts[cstart]
+        if field not in self._data:
+            self._data[field] = g[field][base:self.ends[cend-1]]
+        return self._data[field][start-base:self.ends[i]-base].copy()
 
 class Gadget4DataFile(DataFile):
     _io_attrs = ("ntrees", "nnodes", "tree_sizes", "offsets")
+    _tree_store = None
     def _load_properties(self):
         self.open()
         self.ntrees = int(self.fh["Header"].attrs["Ntrees_ThisFile"])
@@ -97,6 +149,18 @@ class Gadget4TreeFieldIO(TreeFieldIO):
 
                 my_slice = slice(my_start, my_end)
 
+            # Read from the data file's tree store if the whole
+            # tree is in it.
+            store = data_file._tree_store
+            if store is not None and root_node._fi == root_node._fei and \
+              si in store:
+                def read(fieldname):
+                    return store.get_field(
+                        fieldname, si, root_only=root_only)
+            else:
+                def read(fieldname):
+                    return g[fieldname][my_slice]
+
             field_cache = {}
             for field in rfields:
                 fs = freg.search(field)
@@ -104,10 +168,10 @@ class Gadget4TreeFieldIO(TreeFieldIO):
                     fieldname, ifield = fs.groups()
                     ifield = int(ifield)
                     if fieldname not in field_cache:
-                        field_cache[fieldname] = g[fieldname][my_slice]
+                        field_cache[fieldname] = read(fieldname)
                     field_data[field].append(field_cache[fieldname][:, ifield])
                 else:
-                    field_data[field].append(g[field][my_slice])
+                    field_data[field].append(read(field))
 
             if close:
                 data_file.close()
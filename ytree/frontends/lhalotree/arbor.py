@@ -22,7 +22,7 @@ from unyt.exceptions import \
     UnitParseError
 
 from ytree.data_structures.arbor import \
-    Arbor
+    SegmentedArbor
 
 from ytree.frontends.lhalotree.fields import \
     LHaloTreeFieldInfo
@@ -34,7 +34,7 @@ from ytree.utilities.logger import \
     ytreeLogger
 
 
-class LHaloTreeArbor(Arbor):
+class LHaloTreeArbor(SegmentedArbor):
     """
     Arbors for LHaloTree data.
     """
@@ -43,7 +43,9 @@ class LHaloTreeArbor(Arbor):
     _tree_field_io_class = LHaloTreeTreeFieldIO
     _root_field_io_class = LHaloTreeRootFieldIO
     _default_dtype = np.float32
-    _node_io_attrs = ('_lht', '_index_in_lht')
+    # _fi: the index of the file containing each tree
+    _node_io_attrs = ('_fi', '_index_in_lht')
+    _plant_cache_version = 2
 
     def __init__(self, *args, **kwargs):
         r"""Added reader class to allow fast access of header info."""
@@ -95,10 +97,10 @@ class LHaloTreeArbor(Arbor):
     #     if func is None:
     #         raise RuntimeError("No function passed.")
     #     fd = self._node_io_fd
-    #     if fd is None or (node._lht.filename != fd.name):
+    #     if fd is None or (self._lhtfiles[node._fi].filename != fd.name):
     #         if fd is not None:
     #             fd.close()
-    #         self._node_io_fd = open(node._lht.filename, 'rb')
+    #         self._node_io_fd = open(self._lhtfiles[node._fi].filename, 'rb')
     #     kwargs["f"] = self._node_io_fd
     #     return func(node, *args, **kwargs)
 
@@ -168,6 +170,9 @@ class LHaloTreeArbor(Arbor):
         self.field_list = fields
         self.field_info.update(fi)
 
+    def _get_plant_cache_files(self):
+        return [lht.filename for lht in self._lhtfiles]
+
     def _plant_trees(self):
         """
         This is where we figure out how many trees there are,
@@ -177,28 +182,47 @@ class LHaloTreeArbor(Arbor):
 
         if self.is_planted:
             return
+        if self._load_plant_cache():
+            return
 
-        # open file, count trees
-        ntrees_tot = 0
-        for lht in self._lhtfiles:
-            ntrees_tot += lht.ntrees
-        self._size = ntrees_tot
-
-        pbar = get_pbar("Loading tree roots", ntrees_tot)
-        self._node_info['_lht'] = np.empty(ntrees_tot, dtype=object)
+        # count trees in each file
+        ntrees = np.array([lht.ntrees for lht in self._lhtfiles])
+        self._size = ntrees.sum()
+        ei = ntrees.cumsum()
+        si = ei - ntrees
 
-        itot = 0
+        pbar = get_pbar("Loading tree roots", self._size)
         for ifile, lht in enumerate(self._lhtfiles):
-            ntrees = lht.ntrees
-            root_uids = lht.all_uids[lht.nhalos_before_tree]
-            for i in range(ntrees):
-                self._node_info['uid'][itot] = root_uids[i]
-                self._node_info['_lht'][itot] = lht
-                self._node_info['_index_in_lht'][itot] = i
-                itot += 1
-                pbar.update(itot)
+            my_slice = slice(si[ifile], ei[ifile])
+            self._node_info['uid'][my_slice] = \
+              lht.all_uids[lht.nhalos_before_tree]
+            self._node_info['_fi'][my_slice] = ifile
+            self._node_info['_index_in_lht'][my_slice] = \
+              np.arange(lht.ntrees)
+            pbar.update(ei[ifile])
 
         pbar.finish()
+        self._save_plant_cache()
+
+    def _node_io_loop_prepare(self, nodes):
+        self._plant_trees()
+
+        (fi, ti), ufi, index_list, return_order = \
+          self._group_node_file_indices(nodes, attrs=self._node_io_attrs)
+        data_files = [self._lhtfiles[i] for i in ufi]
+
+        # Read the trees needed from each file in contiguous batches.
+        for lht, indices in zip(data_files, index_list):
+            lht.set_batch(ti[indices])
+
+        return data_files, index_list, return_order
+
+    def _node_io_loop_start(self, data_file):
+        # files are memory-mapped, so there is nothing to open
+        pass
+
+    def _node_io_loop_finish(self, data_file):
+        data_file.clear_batch()
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
@@ -75,7 +75,7 @@ class LHaloTreeTreeFieldIO(TreeFieldIO):
         if dtypes is None:
             dtypes = {}
 
-        lht = root_node._lht
+        lht = self.arbor._lhtfiles[root_node._fi]
 
         # This stores the file ID in a class that handles clean up via
         # weakref.finalize. The cached file object is checked to see if it
@@ -446,11 +446,8 @@ class LHaloTreeReader:
 
         """
         # Tree num array
-        self.treenum_arr = np.zeros(self.totnhalos, dtype='int64')
-        start = self.nhalos_before_tree
-        stop = start + self.nhalos_per_tree
-        for t in range(self.ntrees):
-            self.treenum_arr[start[t]:stop[t]] = t
+        self.treenum_arr = np.repeat(
+            np.arange(self.ntrees, dtype='int64'), self.nhalos_per_tree)
         # Memmap/file object
         self.fobj = np.memmap(self.filename, dtype=self.item_dtype, mode='c',
                               offset=self.header_size)
@@ -674,6 +671,11 @@ class LHaloTreeReader:
             dict: Dictionary of fields for each halo in the file/tree/halo.
 
         """
+        if self._batch_ranges is not None and halonum is None and \
+          not skip_add_fields and not validate:
+            ibatch = self._get_batch_index(treenum)
+            if ibatch >= 0:
+                return self._read_batched_tree(treenum, ibatch)
         if treenum >= 0:
             start = self.nhalos_before_tree[treenum]
             if halonum is None:
@@ -694,6 +696,107 @@ class LHaloTreeReader:
                                            validate=validate)
         return out
 
+    def read_tree_range(self, start, end, skip_add_fields=False,
+                        validate=False):
+        r"""Read a contiguous range of trees from the file.
+
+        Raw fields are views of the memory-mapped file, so nothing is
+        copied, and calculated fields are added once for the whole range.
+
+        Args:
+            start (int): Index of the first tree that should be returned.
+            end (int): Index after the last tree that should be returned.
+            skip_add_fields (bool, optional): If True, the calculated fields
+                will not be added. Defaults to False.
+            validate (bool, optional): If True, the resulting data will be
+                validated. Defaults to False.
+
+        Returns:
+            dict: Dictionary of fields for each halo in the range of trees.
+
+        """
+        bounds = np.append(self.nhalos_before_tree, self.totnhalos)
+        idx = slice(bounds[start], bounds[end])
+        data = self.fobj[idx]
+        out = {k: data[k] for k in data.dtype.names}
+        if not skip_add_fields:
+            out = self._add_computed_fields(idx, out, validate=validate)
+        return out
+
+    _batch_ranges = None
+    _batch_index = None
+    _batch = None
+
+    def set_batch(self, trees, chunk_size=1048576):
+        r"""Read trees in contiguous ranges instead of one at a time.
+
+        The trees are split into ranges spanning roughly chunk_size
+        halos. Until clear_batch is called, the first time a tree in a
+        range is read, the whole range is read and read_single_tree
+        returns copies of slices of this data. Only one range is kept
+        in memory at a time.
+
+        Args:
+            trees (array): Indices of the trees that will be read.
+            chunk_size (int, optional): Number of halos after which a new
+                range is started. Defaults to 1048576.
+
+        """
+        trees = np.unique(trees)
+        starts = self.nhalos_before_tree[trees]
+        chunk_ids = (starts - starts[0]) // chunk_size
+        bounds = np.concatenate(
+            [[0], np.where(np.diff(chunk_ids) > 0)[0] + 1, [trees.size]])
+        # first tree and one past the last tree of each range
+        self._batch_ranges = np.array(
+            [trees[bounds[:-1]], trees[bounds[1:] - 1] + 1]).T
+        self._batch_index = None
+        self._batch = None
+
+    def clear_batch(self):
+        r"""Stop reading trees in ranges set with set_batch."""
+        self._batch_ranges = None
+        self._batch_index = None
+        self._batch = None
+
+    def _get_batch_index(self, treenum):
+        r"""Get the index of the range set with set_batch holding a tree.
+
+        Args:
+            treenum (int): Index of the tree.
+
+        Returns:
+            int: Index of the range or -1 if the tree is in no range.
+
+        """
+        ibatch = np.searchsorted(
+            self._batch_ranges[:, 0], treenum, side="right") - 1
+        if ibatch < 0 or treenum >= self._batch_ranges[ibatch, 1]:
+            return -1
+        return ibatch
+
+    def _read_batched_tree(self, treenum, ibatch):
+        r"""Get a single tree from a range set with set_batch.
+
+        Args:
+            treenum (int): Index of the tree that should be returned.
+            ibatch (int): Index of the range holding the tree.
+
+        Returns:
+            dict: Dictionary of fields for each halo in the tree.
+
+        """
+        start, end = self._batch_ranges[ibatch]
+        if ibatch != self._batch_index:
+            self._batch_index = ibatch
+            self._batch = self.read_tree_range(start, end)
+        hstart = self.nhalos_before_tree[treenum] - \
+          self.nhalos_before_tree[start]
+        hend = hstart + self.nhalos_per_tree[treenum]
+        # Copy so that changes to one tree's arrays, such as unit
+        # conversions, do not affect the batch.
+        return {k: v[hstart:hend].copy() for k, v in self._batch.items()}
+
     def read_single_halo(self, treenum, halonum, **kwargs):
         r"""Read a single halo entry from a tree in the file.
 
@@ -770,8 +873,23 @@ class LHaloTreeReader:
             assert (halonum is not None)
         else:
             halonum = None
-        # Unique ID for each halo and descendant in tree
         idx = self.get_total_index(treenum, halonum)
+        return self._add_computed_fields(idx, tree, validate=validate)
+
+    def _add_computed_fields(self, idx, tree, validate=False):
+        r"""Add computed fields for halos at a given index in the file.
+
+        Args:
+            idx (int, slice): Index/slice of the halos in the file.
+            tree (dict): Dictionary of fields for each halo.
+            validate (bool, optional): If True, the resulting data will be
+                validated. Defaults to False.
+
+        Returns:
+            dict: Dictionary of fields for each halo with added fields.
+
+        """
+        # Unique ID for each halo and descendant in tree
         uid = self.all_uids[idx]
         desc_uid = self.all_desc_uids[idx]
         # Scale factors
@@ -93,6 +93,8 @@ class LHaloTreeHDF5Arbor(SegmentedArbor):
     def _plant_trees(self):
         if self.is_planted or self._size == 0:
             return
+        if self._load_plant_cache():
+            return
 
         c = 0
         file_offsets = self._file_count.cumsum() - self._file_count
@@ -114,6 +116,7 @@ class LHaloTreeHDF5Arbor(SegmentedArbor):
         pbar.finish()
         uids = self._node_info['_tree_size']
         self._node_info['uid'] = uids.cumsum() - uids
+        self._save_plant_cache()
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
@@ -16,9 +16,6 @@ MoriaArbor class and member functions
 import h5py
 import numpy as np
 
-from yt.funcs import \
-    get_pbar
-
 from ytree.data_structures.arbor import \
     Arbor
 
@@ -42,6 +39,14 @@ class MoriaArbor(Arbor):
     _root_field_io_class = MoriaRootFieldIO
     _tree_field_io_class = MoriaTreeFieldIO
     _node_io_attrs = ('_ai', '_si', '_ei')
+    _plant_cache_version = 2
+
+    def __init__(self, filename, cache_size=4294967296,
+                 chunk_size=None, memmap=False):
+        self._cache_size = cache_size
+        self._chunk_size = chunk_size
+        self._memmap = memmap
+        super().__init__(filename)
 
     def _parse_parameter_file(self):
         f = h5py.File(self.parameter_filename, mode='r')
@@ -76,11 +81,15 @@ class MoriaArbor(Arbor):
         self.field_info.update(fi)
 
     def _get_data_files(self):
-        self.data_files = [self._data_file_class(self.parameter_filename)]
+        self.data_files = [self._data_file_class(
+            self.parameter_filename, cache_size=self._cache_size,
+            chunk_size=self._chunk_size, memmap=self._memmap)]
 
     def _plant_trees(self):
         if self.is_planted:
             return
+        if self._load_plant_cache():
+            return
 
         f = h5py.File(self.parameter_filename, mode='r')
         status = f["status_sparta"][()]
@@ -94,14 +103,44 @@ class MoriaArbor(Arbor):
         self._node_info['uid'][:] = f["id"][-1][hosts]
         f.close()
 
-        pbar = get_pbar('Planting trees', self._size)
         si = self._node_info['_si']
         ei = self._node_info['_ei']
-        for i in range(self._size):
-            tree_status = status[:, si[i]:ei[i]]
-            self._node_info['_tree_size'][i] = (tree_status != 0).sum()
-            pbar.update(i+1)
-        pbar.finish()
+        # Each tree is a contiguous range of columns, so sum the
+        # number of existing halos in each column over each range.
+        exists = status != 0
+        self._node_info['_tree_size'][:] = \
+          np.add.reduceat(exists.sum(axis=0), si)
+
+        # For each tree, the indices of existing halos within its
+        # flattened status array, ordered from the last snapshot.
+        snap, col = np.nonzero(exists[::-1])
+        tree = np.searchsorted(si, col, side="right") - 1
+        keep = tree >= 0
+        snap, col, tree = snap[keep], col[keep], tree[keep]
+        order = np.argsort(tree, kind="stable")
+        self._status_indices = \
+          (snap * (ei - si)[tree] + col - si[tree])[order]
+        self._save_plant_cache()
+
+    def _get_plant_cache_state(self):
+        return {"status_indices": self._status_indices}
+
+    def _set_plant_cache_state(self, state):
+        self._status_indices = state["status_indices"]
+
+    _status_offsets = None
+    def _get_status_indices(self, root_node):
+        """
+        Get the indices of existing halos in the flattened status
+        array of a tree.
+        """
+
+        if self._status_offsets is None:
+            sizes = self._node_info['_tree_size']
+            self._status_offsets = np.concatenate([[0], sizes.cumsum()])
+        i = root_node._arbor_index
+        return self._status_indices[
+            self._status_offsets[i]:self._status_offsets[i+1]]
 
     def _setup_tree(self, tree_node, **kwargs):
         """
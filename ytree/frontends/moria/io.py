@@ -13,6 +13,7 @@ MoriaArbor io classes and member functions
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+from collections import OrderedDict
 import h5py
 import numpy as np
 import re
@@ -22,11 +23,104 @@ from ytree.data_structures.io import \
     DataFile, \
     TreeFieldIO
 
+class MoriaFieldStore:
+    """
+    Storage for (snapshot, halo) datasets while reading many trees.
+
+    Fields are kept in least-recently-used order, and the oldest
+    are dropped when their total size would exceed max_size bytes.
+    Fields too big to fit are read directly from the file. If
+    chunk_size is None, whole datasets are stored. Otherwise, only
+    ranges of at least chunk_size halos are stored, moving forward
+    as trees are read in order. If memmap is True, datasets that
+    are stored contiguously are memory-mapped instead of read.
+    These do not count toward max_size.
+    """
+
+    def __init__(self, max_size=4294967296, chunk_size=None, memmap=False):
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.memmap = memmap
+        self.reset()
+
+    def reset(self):
+        self.data = OrderedDict()
+        self.size = 0
+
+    def get(self, fh, field, index):
+        rows, cols = index
+        entry = self.data.get(field)
+        if entry is None or entry[0] > cols.start or entry[1] < cols.stop:
+            entry = self._load(fh, field, cols.start, cols.stop)
+            if entry is None:
+                return fh[field][index]
+        else:
+            self.data.move_to_end(field)
+
+        start, end, data, nbytes = entry
+        return data[rows, cols.start-start:cols.stop-start]
+
+    def _load(self, fh, field, start, end):
+        """
+        Read a range of halos for a field, making room for it.
+        """
+
+        self._remove(field)
+        ds = fh[field]
+        size = ds.shape[1]
+
+        if self.memmap:
+            data = _memmap_dataset(ds)
+            if data is not None:
+                entry = self.data[field] = (0, size, data, 0)
+                return entry
+
+        if self.chunk_size is None:
+            start, end = 0, size
+        else:
+            end = min(max(end, start + self.chunk_size), size)
+        nbytes = ds.dtype.itemsize * \
+          int(np.prod(ds.shape)) // max(size, 1) * (end - start)
+        if nbytes > self.max_size:
+            return None
+
+        while self.data and self.size + nbytes > self.max_size:
+            self._remove(next(iter(self.data)))
+        entry = self.data[field] = (start, end, ds[:, start:end], nbytes)
+        self.size += nbytes
+        return entry
+
+    def _remove(self, field):
+        entry = self.data.pop(field, None)
+        if entry is not None:
+            self.size -= entry[3]
+
+def _memmap_dataset(ds):
+    """
+    Memory-map an HDF5 dataset if it is stored contiguously.
+    Otherwise, return None.
+    """
+
+    if ds.chunks is not None:
+        return None
+    offset = ds.id.get_offset()
+    if offset is None:
+        return None
+    return np.memmap(ds.file.filename, mode="r", dtype=ds.dtype,
+                     offset=offset, shape=ds.shape)
+
 class MoriaDataFile(DataFile):
     field_cache = None
     full_read = False
     fh = None
 
+    def __init__(self, filename, cache_size=4294967296,
+                 chunk_size=None, memmap=False):
+        super().__init__(filename)
+        self.cache_size = cache_size
+        self.chunk_size = chunk_size
+        self.memmap = memmap
+
     def open(self):
         self.fh = h5py.File(self.filename, mode="r")
 
@@ -37,11 +131,10 @@ class MoriaDataFile(DataFile):
     def read_data(self, field, index):
         if self.full_read:
             if self.field_cache is None:
-                self.field_cache = {}
-
-            if field not in self.field_cache:
-                self.field_cache[field] = self.fh[field][()]
-            return self.field_cache[field][index]
+                self.field_cache = MoriaFieldStore(
+                    max_size=self.cache_size, chunk_size=self.chunk_size,
+                    memmap=self.memmap)
+            return self.field_cache.get(self.fh, field, index)
         else:
             return self.fh[field][index]
 
@@ -84,9 +177,8 @@ class MoriaTreeFieldIO(TreeFieldIO):
         else:
             index = (slice(None), slice(root_node._si, root_node._ei))
             if not hasattr(root_node, "_status"):
-                status = data_file.read_data("status_sparta", index)
-                status = self._transform_data(status)
-                root_node._status = np.where(status != 0)[0]
+                root_node._status = \
+                  self.arbor._get_status_indices(root_node)
             dfilter = root_node._status
 
         # this field cache is for temporarily storing vector field data
@@ -24,6 +24,7 @@ from ytree.frontends.treefrog.fields import \
     TreeFrogFieldInfo
 from ytree.frontends.treefrog.io import \
     TreeFrogDataFile, \
+    TreeFrogForestStore, \
     TreeFrogRootFieldIO, \
     TreeFrogTreeFieldIO
 from ytree.utilities.logger import \
@@ -39,6 +40,9 @@ class TreeFrogArbor(SegmentedArbor):
     _field_info_class = TreeFrogFieldInfo
     _root_field_io_class = TreeFrogRootFieldIO
     _tree_field_io_class = TreeFrogTreeFieldIO
+    # _ls: the last snapshot in which a forest exists
+    # _lo: the offset of the forest within that snapshot
+    _node_io_attrs = ('_fi', '_si', '_ls', '_lo')
 
     def __init__(self, filename):
         filename = self._determine_filename(filename)
@@ -110,6 +114,8 @@ class TreeFrogArbor(SegmentedArbor):
     def _plant_trees(self):
         if self.is_planted or self._size == 0:
             return
+        if self._load_plant_cache():
+            return
 
         with h5py.File(self.parameter_filename, mode="r") as f:
             self._node_info['_tree_size'] = f["ForestInfo"]["ForestSizes"][()]
@@ -122,10 +128,32 @@ class TreeFrogArbor(SegmentedArbor):
         self._node_info['_fi'] = fi
         # index within that file each forest is at
         self._node_info['_si'] = trees - si[fi]
+        # where each forest's root is
+        for idf, data_file in enumerate(self.data_files):
+            my_slice = slice(si[idf], ei[idf])
+            self._node_info['_ls'][my_slice] = data_file.arbor_start
+            self._node_info['_lo'][my_slice] = data_file.arbor_offset
         # This is slightly unsafe since the call to get_fields to get the uid field
         # will call _plant_trees, too. It will not get here because is_planted will
         # be True. As long as _fi and _si are initialized properly, it should be ok.
         self._node_info['uid'] = self["uid"]
+        self._save_plant_cache()
+
+    def _node_io_loop_prepare(self, nodes):
+        (fi, si), ufi, index_list, return_order = \
+          self._group_node_file_indices(nodes)
+        data_files = [self.data_files[i] for i in ufi]
+
+        # Give each data file the list of forests to be read from it
+        # so that field data can be read for many forests at once.
+        for data_file, indices in zip(data_files, index_list):
+            data_file._forest_store = \
+              TreeFrogForestStore(data_file, si[indices])
+        return data_files, index_list, return_order
+
+    def _node_io_loop_finish(self, data_file):
+        data_file._forest_store = None
+        super()._node_io_loop_finish(data_file)
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
@@ -28,7 +28,12 @@ from ytree.utilities.exceptions import \
     ArborFieldNotFound
 
 class TreeFrogDataFile(DataFile):
-    def _calculate_arbor_offsets(self):
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._groups = {}
+        self._forest_store = None
+
+    def _calculate_arbor_offsets(self, chunk_size=65536):
         """
         Calculate snapshots and snapshot-offsets where each forest appears last.
 
@@ -41,20 +46,27 @@ class TreeFrogDataFile(DataFile):
         - the file offset within that last snapshot
 
         Since ytree reads from the root backward, this tell us where to start
-        reading for any given forest.
+        reading for any given forest. The arrays are read chunk_size forests
+        at a time to limit memory use.
         """
         close = self.fh is None
         self.open()
         fh = self.fh
 
-        offsets = fh["ForestInfoInFile/ForestOffsetsAllSnaps"][()]
-        sizes = fh["ForestInfoInFile/ForestSizesAllSnaps"][()]
+        offsets = fh["ForestInfoInFile/ForestOffsetsAllSnaps"]
+        sizes = fh["ForestInfoInFile/ForestSizesAllSnaps"]
         size = sizes.shape[0]
-        s1 = np.empty(size, dtype=int)
-        o1 = np.empty(size, dtype=int)
-        for i in range(size):
-            s1[i] = np.where(sizes[i] > 0)[0][-1]
-            o1[i] = offsets[i, s1[i]]
+        nsnaps = sizes.shape[1]
+        s1 = np.empty(size, dtype=np.int64)
+        o1 = np.empty(size, dtype=np.int64)
+        for start in range(0, size, chunk_size):
+            end = min(start + chunk_size, size)
+            # the first non-zero size counting back from the last snapshot
+            my_s1 = nsnaps - 1 - \
+              np.argmax(sizes[start:end][:, ::-1] > 0, axis=1)
+            s1[start:end] = my_s1
+            o1[start:end] = \
+              offsets[start:end][np.arange(end - start), my_s1]
 
         if close:
             self.close()
@@ -63,18 +75,35 @@ class TreeFrogDataFile(DataFile):
         self._arbor_offset = o1
 
     def read_data(self, group, field, frange=None):
+        """
+        Read a field from a snapshot group.
+
+        If frange is a slice, only that part of the dataset is read.
+        """
+
         if frange is None:
-            frange = ()
+            frange = slice(None)
+        g = self._get_group(group)
         # This is the easiest way I can think of to fix the
         # descendent ids of roots.
         if field == "Descendant":
             # Descendant and ID fields are uint64. We need to convert them
             # to signed ints in order to set equal to -1.
-            data = self.fh[group][field][()][frange].astype("int64")
-            ids = self.fh[group]["ID"][()][frange].astype("int64")
+            data = g[field][frange].astype("int64")
+            ids = g["ID"][frange].astype("int64")
             data[data == ids] = -1
             return data
-        return self.fh[group][field][()][frange]
+        return g[field][frange]
+
+    def _get_group(self, group):
+        """
+        Get an HDF5 group, keeping the handle while the file is open.
+        """
+
+        g = self._groups.get(group)
+        if g is None:
+            g = self._groups[group] = self.fh[group]
+        return g
 
     _arbor_start = None
     @property
@@ -94,6 +123,142 @@ class TreeFrogDataFile(DataFile):
         if self.fh is None:
             self.fh = h5py.File(self.filename, mode="r")
 
+    def close(self):
+        self._groups.clear()
+        super().close()
+
+class TreeFrogForestStore:
+    """
+    Field data for a set of forests in a single data file.
+
+    The forests are split into chunks of roughly chunk_size halos.
+    When a field is needed for one forest, it is read for the whole
+    chunk by reading the halos of its forests from each snapshot
+    group, with the ranges of neighboring forests merged into single
+    reads. The data are then arranged by forest in the same order as
+    reading each forest separately, i.e., from the last snapshot to
+    the first.
+    """
+
+    def __init__(self, data_file, forests, chunk_size=1048576):
+        self.data_file = data_file
+        # indices of the forests within the data file
+        self.forests = np.unique(forests)
+        self.chunk_size = chunk_size
+        self._sizes = None
+        self._chunk = None
+        self._data = {}
+
+    def __contains__(self, forest):
+        i = np.searchsorted(self.forests, forest)
+        return i < self.forests.size and self.forests[i] == forest
+
+    def _setup(self):
+        """
+        Read the sizes and offsets of all forests in each snapshot
+        and assign forests to chunks.
+        """
+
+        fh = self.data_file.fh
+        self._sizes = \
+          fh["ForestInfoInFile/ForestSizesAllSnaps"][self.forests, :]
+        self._offsets = \
+          fh["ForestInfoInFile/ForestOffsetsAllSnaps"][self.forests, :]
+
+        tree_sizes = self._sizes.sum(axis=1)
+        chunk_ids = (tree_sizes.cumsum() - tree_sizes) // self.chunk_size
+        self._chunk_bounds = np.concatenate(
+            [[0], np.where(np.diff(chunk_ids) > 0)[0] + 1,
+             [self.forests.size]])
+
+    def _load_chunk(self, ichunk):
+        """
+        Figure out what to read from each snapshot for a chunk
+        and how to arrange it by forest.
+        """
+
+        start, end = self._chunk_bounds[ichunk:ichunk+2]
+        sizes = self._sizes[start:end]
+        offsets = self._offsets[start:end]
+        nsnaps = sizes.shape[1]
+
+        # one piece per forest per snapshot, ordered by forest
+        # and then from the last snapshot to the first
+        ifor, isnap = np.nonzero(sizes[:, ::-1] > 0)
+        isnap = nsnaps - 1 - isnap
+        plen = sizes[ifor, isnap]
+
+        # Merge pieces that overlap or touch into ranges to be read.
+        # Positions are shifted by snapshot so that pieces in
+        # different snapshots are never merged.
+        shift = (offsets + sizes).max() + 1
+        gstart = isnap * shift + offsets[ifor, isnap]
+        gend = gstart + plen
+        order = np.argsort(gstart, kind="stable")
+        sstart = gstart[order]
+        send = gend[order]
+        new = np.ones(order.size, dtype=bool)
+        new[1:] = sstart[1:] > np.maximum.accumulate(send)[:-1]
+        rstart = sstart[new]
+        rend = np.maximum.reduceat(send, np.where(new)[0])
+        rsize = rend - rstart
+        # where each range's data starts in the combined array
+        rbase = rsize.cumsum() - rsize
+
+        # where each piece is in the combined array
+        irange = np.searchsorted(rstart, gstart, side="right") - 1
+        pstart = rbase[irange] + gstart - rstart[irange]
+        pcum = plen.cumsum() - plen
+        self._gather = np.repeat(pstart - pcum, plen) + \
+          np.arange(plen.sum())
+        self._snapshots = np.repeat(isnap, plen)
+
+        rsnap = rstart // shift
+        self._spans = list(zip(rsnap, rstart - rsnap * shift,
+                               rend - rsnap * shift))
+
+        tree_sizes = sizes.sum(axis=1)
+        self._tree_bounds = np.concatenate([[0], tree_sizes.cumsum()])
+        self._chunk = ichunk
+        self._data.clear()
+
+    def _get_slice(self, forest):
+        """
+        Get the slice of the chunk's data for a forest, loading
+        the chunk if necessary.
+        """
+
+        if self._sizes is None:
+            self._setup()
+        i = np.searchsorted(self.forests, forest)
+        ichunk = np.digitize(i, self._chunk_bounds) - 1
+        if ichunk != self._chunk:
+            self._load_chunk(ichunk)
+        i -= self._chunk_bounds[ichunk]
+        return slice(self._tree_bounds[i], self._tree_bounds[i+1])
+
+    def get_field(self, field, forest):
+        """
+        Get a field for a forest.
+        """
+
+        my_slice = self._get_slice(forest)
+        if field not in self._data:
+            data = [self.data_file.read_data(
+                f"Snap_{gi:03d}", field, frange=slice(ostart, oend))
+                for gi, ostart, oend in self._spans]
+            self._data[field] = np.concatenate(data)[self._gather]
+        # copy so the chunk can be freed when the next one is loaded
+        return self._data[field][my_slice].copy()
+
+    def get_snapshots(self, forest):
+        """
+        Get the snapshot of each halo in a forest.
+        """
+
+        my_slice = self._get_slice(forest)
+        return self._snapshots[my_slice]
+
 class TreeFrogTreeFieldIO(TreeFieldIO):
     def _read_fields(self, root_node, fields, dtypes=None,
                      root_only=False):
@@ -118,6 +283,49 @@ class TreeFrogTreeFieldIO(TreeFieldIO):
             close = True
             data_file.open()
 
+        si = root_node._si
+        store = data_file._forest_store
+        if not root_only and store is not None and si in store:
+            rdata = self._read_store_fields(store, si, rfields, afields)
+        else:
+            rdata = self._read_forest_fields(
+                root_node, data_file, rfields, afields, root_only)
+
+        if close:
+            data_file.close()
+
+        field_data = root_node.field_data
+        for field in fields:
+            field_data[field] = rdata[field]
+            dtype = my_dtypes.get(field, fi[field].get("dtype", None))
+            if dtype is not None:
+                field_data[field] = field_data[field].astype(dtype)
+
+        self._apply_units(fields, field_data)
+
+        return field_data
+
+    def _read_store_fields(self, store, si, rfields, afields):
+        """
+        Get fields for a forest from the data file's forest store.
+        """
+
+        rdata = {}
+        for field in rfields:
+            rdata[field] = store.get_field(field, si)
+        if afields:
+            snapshots = store.get_snapshots(si)
+            for field in afields:
+                rdata[field] = self._get_arbor_field(
+                    field, snapshots, snapshots.size)
+        return rdata
+
+    def _read_forest_fields(self, root_node, data_file, rfields, afields,
+                            root_only):
+        """
+        Read fields for a single forest, one snapshot at a time.
+        """
+
         fh = data_file.fh
         si = root_node._si
 
@@ -151,20 +359,7 @@ class TreeFrogTreeFieldIO(TreeFieldIO):
 
         for field, data in rdata.items():
             rdata[field] = np.concatenate(data)
-
-        if close:
-            data_file.close()
-
-        field_data = root_node.field_data
-        for field in fields:
-            field_data[field] = rdata[field]
-            dtype = my_dtypes.get(field, fi[field].get("dtype", None))
-            if dtype is not None:
-                field_data[field] = field_data[field].astype(dtype)
-
-        self._apply_units(fields, field_data)
-
-        return field_data
+        return rdata
 
     def _get_arbor_field(self, field, gi, size):
         if field == "scale_factor":
@@ -206,9 +401,9 @@ class TreeFrogRootFieldIO(DefaultRootFieldIO):
 
             size = nodes.size
             # the index of the last snapshot for each forest
-            s1 = data_file.arbor_start[nodes]
+            s1 = arbor._node_info['_ls'][nodes]
             # the offset within that snapshot
-            o1 = data_file.arbor_offset[nodes]
+            o1 = arbor._node_info['_lo'][nodes]
 
             fdata = {}
             # np.unique(s1) gives us the total number of HDF5 groups we need to open
@@ -217,12 +412,16 @@ class TreeFrogRootFieldIO(DefaultRootFieldIO):
                 # which forests' roots are in this group
                 isnap = np.where(s1 == gi)[0]
 
+                # o1[isnap] is the list of file offsets for this HDF5 group
+                my_o1 = o1[isnap]
+                ostart = my_o1.min()
+                frange = slice(ostart, my_o1.max() + 1)
+
                 for field in rfields:
-                    gdata = data_file.read_data(group, field)
+                    gdata = data_file.read_data(group, field, frange=frange)
                     if field not in fdata:
                         fdata[field] = np.empty(size, dtype=gdata.dtype)
-                    # o1[isnap] is the list of file offsets for this HDF5 group
-                    fdata[field][isnap] = gdata[o1[isnap]]
+                    fdata[field][isnap] = gdata[my_o1 - ostart]
 
             for field in rfields:
                 rdata[field].append(fdata[field])
@@ -30,6 +30,7 @@ from ytree.data_structures.arbor import \
     Arbor
 from ytree.frontends.ytree.io import \
     YTreeDataFile, \
+    YTreeFieldCache, \
     YTreeRootFieldIO, \
     YTreeTreeFieldIO
 from ytree.frontends.ytree.utilities import \
@@ -54,6 +55,10 @@ class YTreeArbor(Arbor):
     _suffix = ".h5"
     _node_io_attrs = ('_ai',)
 
+    def __init__(self, filename, cache_size=4294967296):
+        self._cache_size = cache_size
+        super().__init__(filename)
+
     def _node_io_loop_prepare(self, nodes):
         if nodes is None:
             nodes = np.arange(self.size)
@@ -80,11 +85,11 @@ class YTreeArbor(Arbor):
         return data_files, index_list, return_order
 
     def _node_io_loop_start(self, data_file):
-        data_file._field_cache = {}
+        data_file._field_cache = YTreeFieldCache(data_file.cache_size)
         data_file.open()
 
     def _node_io_loop_finish(self, data_file):
-        data_file._field_cache = {}
+        data_file._field_cache = None
         data_file.close()
 
     def _parse_parameter_file(self):
@@ -137,7 +142,8 @@ class YTreeArbor(Arbor):
 
         self._node_info['_ai'][:] = np.arange(self.size)
         self.data_files = \
-          [YTreeDataFile(f"{self._prefix}_{i:04d}{self._suffix}")
+          [YTreeDataFile(f"{self._prefix}_{i:04d}{self._suffix}",
+                         cache_size=self._cache_size)
            for i in range(self._node_io._si.size)]
         if self.analysis_filename is not None:
             for i, df in enumerate(self.data_files):
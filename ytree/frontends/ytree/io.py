@@ -13,17 +13,51 @@ YTreeArbor io classes and member functions
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+from collections import OrderedDict
 import h5py
 import numpy as np
+from unyt import \
+    unyt_array, \
+    unyt_quantity
 
 from ytree.data_structures.io import \
     DefaultRootFieldIO, \
     DataFile, \
     TreeFieldIO
 
+class YTreeFieldCache:
+    """
+    Whole fields from a data file kept while looping over trees.
+
+    Fields are kept in least-recently-used order, and the oldest
+    are dropped when their total size would exceed max_size bytes.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.size = 0
+
+    def get(self, field):
+        data = self.data.get(field)
+        if data is not None:
+            self.data.move_to_end(field)
+        return data
+
+    def fits(self, nbytes):
+        return nbytes <= self.max_size
+
+    def add(self, field, data):
+        while self.data and self.size + data.nbytes > self.max_size:
+            old = self.data.popitem(last=False)[1]
+            self.size -= old.nbytes
+        self.data[field] = data
+        self.size += data.nbytes
+
 class YTreeDataFile(DataFile):
-    def __init__(self, filename):
+    def __init__(self, filename, cache_size=4294967296):
         super().__init__(filename)
+        self.cache_size = cache_size
         self._field_cache = None
         self._start_index = None
         self._end_index = None
@@ -42,15 +76,20 @@ class YTreeDataFile(DataFile):
 
 class YTreeTreeFieldIO(TreeFieldIO):
     def _read_fields(self, root_node, fields, dtypes=None, root_only=False):
+        """
+        Read fields for a single tree.
+
+        Inside of a node io loop, whole fields are read and kept in
+        the data file's field cache as long as they fit. Otherwise,
+        only the part of each field belonging to the tree is read.
+        """
+
         dfi = np.digitize(root_node._ai, self._ei)
         data_file = self.arbor.data_files[dfi]
 
         if dtypes is None:
             dtypes = {}
 
-        if data_file._field_cache is None:
-            data_file._field_cache = {}
-
         if data_file.fh is None:
             close = True
             data_file.open()
@@ -63,61 +102,312 @@ class YTreeTreeFieldIO(TreeFieldIO):
                 setattr(data_file, f"_{itype}_index",
                         data_file.fh[f"index/tree_{itype}_index"][()])
         ii = root_node._ai - self._si[dfi]
+        start = data_file._start_index[ii]
+        if root_only:
+            end = start + 1
+        else:
+            end = data_file._end_index[ii]
 
         field_data = {}
-        fi = self.arbor.field_info
+        cache = data_file._field_cache
         for field in fields:
-            if field not in data_file._field_cache:
-                if fi[field].get("type") == "analysis_saved":
-                    fh = data_file.analysis_fh
-                else:
-                    fh = data_file.fh
-                fdata = fh[f"data/{field}"][()]
-
-                dtype = dtypes.get(field)
-                if dtype is not None:
-                    fdata = fdata.astype(dtype)
-
-                units = fi[field].get("units", "")
-                if units != "":
-                    fdata = self.arbor.arr(fdata, units)
-                data_file._field_cache[field] = fdata
-
-            field_data[field] = \
-              data_file._field_cache[field][
-                  data_file._start_index[ii]:data_file._end_index[ii]]
+            fdata = None
+            if cache is not None:
+                fdata = cache.get(field)
+                if fdata is None:
+                    ds = self._get_dataset(data_file, field)
+                    dtype = np.dtype(dtypes.get(field, ds.dtype))
+                    if cache.fits(ds.size * dtype.itemsize):
+                        fdata = self._read_field(ds, field, dtypes)
+                        cache.add(field, fdata)
+
+            if fdata is None:
+                field_data[field] = self._read_field(
+                    self._get_dataset(data_file, field), field, dtypes,
+                    frange=slice(start, end))
+            else:
+                field_data[field] = fdata[start:end]
 
         if close:
             data_file.close()
 
         return field_data
 
+    def _get_dataset(self, data_file, field):
+        if self.arbor.field_info[field].get("type") == "analysis_saved":
+            fh = data_file.analysis_fh
+        else:
+            fh = data_file.fh
+        return fh[f"data/{field}"]
+
+    def _read_field(self, ds, field, dtypes, frange=None):
+        """
+        Read all or part of a field and give it units.
+        """
+
+        if frange is None:
+            frange = slice(None)
+        fdata = ds[frange]
+
+        dtype = dtypes.get(field)
+        if dtype is not None:
+            fdata = fdata.astype(dtype)
+
+        units = self.arbor.field_info[field].get("units", "")
+        if units != "":
+            fdata = self.arbor.arr(fdata, units)
+        return fdata
+
+class YTreeRootField:
+    """
+    A root field that is read from disk only as needed.
+
+    Indexing with integers, slices, or arrays of integers or
+    booleans reads only the requested values straight from the
+    HDF5 file. Anything else, such as arithmetic, unit conversion,
+    or reductions, reads the whole field once, after which this
+    behaves like the full array. The whole field is also read after
+    a few partial reads, or once partial reads would cover a
+    meaningful fraction of it, since each partial read opens the file.
+
+    This reports the class of the full array, so it passes
+    isinstance checks for unyt_array, or ndarray if it has no
+    units. Only the filename and unit registry are kept, not the
+    arbor, so it still works after the arbor is gone.
+    """
+
+    # After this many partial reads, or once partial reads would
+    # cover this fraction of the field, read the whole field.
+    _max_partial_reads = 16
+    _max_partial_fraction = 0.1
+
+    def __init__(self, arbor, filename, field, dtype=None):
+        self.filename = filename
+        self.field = field
+        self._units = arbor.field_info[field].get("units", "")
+        self._registry = arbor.unit_registry
+        with h5py.File(filename, mode="r") as fh:
+            ds = fh[f"data/{field}"]
+            self.shape = ds.shape
+            if dtype is None:
+                dtype = ds.dtype
+        self.dtype = np.dtype(dtype)
+        self._data = None
+        self._nreads = 0
+        self._nrows = 0
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def data(self):
+        """
+        The full array, read the first time it is needed.
+        """
+
+        if self._data is None:
+            self._data = self._apply_units(self._read(slice(None)))
+        return self._data
+
+    def _read(self, key):
+        with h5py.File(self.filename, mode="r") as fh:
+            data = fh[f"data/{self.field}"][key]
+        return np.asarray(data).astype(self.dtype, copy=False)
+
+    def _apply_units(self, data):
+        if self._units == "":
+            return data
+        if np.ndim(data) == 0:
+            return unyt_quantity(
+                data, self._units, registry=self._registry)
+        return unyt_array(data, self._units, registry=self._registry)
+
+    @property
+    def __class__(self):
+        if self._units == "":
+            return np.ndarray
+        return unyt_array
+
+    def __reduce__(self):
+        return self.data.__reduce__()
+
+    def __getitem__(self, key):
+        if self._data is not None or \
+          self._nreads >= self._max_partial_reads:
+            return self.data[key]
+
+        size = len(self)
+        if isinstance(key, (int, np.integer)) and \
+          not isinstance(key, (bool, np.bool_)):
+            if not -size <= key < size:
+                raise IndexError(
+                    f"index {key} is out of bounds for size {size}")
+            indices = int(key) % size
+            nrows = 1
+        elif isinstance(key, slice):
+            start, stop, step = key.indices(size)
+            indices = slice(start, stop, step)
+            nrows = len(range(start, stop, step))
+        elif isinstance(key, (list, np.ndarray)):
+            indices = np.asarray(key)
+            if indices.dtype == bool and indices.shape == (size,):
+                indices = np.where(indices)[0]
+            elif indices.dtype.kind not in "iu" or indices.ndim != 1:
+                return self.data[key]
+            if ((indices < -size) | (indices >= size)).any():
+                raise IndexError(f"index out of bounds for size {size}")
+            indices = indices % size
+            nrows = indices.size
+        else:
+            return self.data[key]
+
+        if self._nrows + nrows > self._max_partial_fraction * size:
+            return self.data[key]
+
+        if isinstance(indices, slice) and indices.step < 0:
+            indices = np.arange(indices.start, indices.stop, indices.step)
+        if isinstance(indices, np.ndarray):
+            data = self._read_indices(indices)
+        else:
+            data = self._read(indices)
+
+        self._nreads += 1
+        self._nrows += nrows
+        return self._apply_units(data)
+
+    def _read_indices(self, indices):
+        """
+        Read values at an array of indices, which HDF5 requires
+        to be increasing and unique.
+        """
+
+        if indices.size == 0:
+            return np.empty(0, dtype=self.dtype)
+        uind, inverse = np.unique(indices, return_inverse=True)
+        # read the range spanning all values if it is not much bigger
+        start, end = uind[0], uind[-1] + 1
+        if end - start <= 4 * uind.size:
+            data = self._read(slice(start, end))[uind - start]
+        else:
+            data = self._read(uind)
+        return data[inverse]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+
+    def __getattr__(self, attr):
+        if attr.startswith("__") or attr in ("_data", "_units"):
+            raise AttributeError(attr)
+        return getattr(self.data, attr)
+
+    @property
+    def units(self):
+        return unyt_array(1, self._units, registry=self._registry).units
+
+    def __array__(self, dtype=None, copy=None):
+        data = np.asarray(self.data)
+        if dtype is not None:
+            data = data.astype(dtype, copy=False)
+        return data
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        return getattr(ufunc, method)(*_unwrap(inputs), **_unwrap(kwargs))
+
+    def __array_function__(self, func, types, args, kwargs):
+        return func(*_unwrap(args), **_unwrap(kwargs))
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __repr__(self):
+        return repr(self.data)
+
+    def __str__(self):
+        return str(self.data)
+
+    __hash__ = None
+
+def _unwrap(obj):
+    """
+    Replace YTreeRootField objects with their data, including
+    inside of lists, tuples, and dicts.
+    """
+
+    if isinstance(obj, YTreeRootField):
+        return obj.data
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_unwrap(item) for item in obj)
+    if isinstance(obj, dict):
+        return dict((key, _unwrap(val)) for key, val in obj.items())
+    return obj
+
+def _delegate(name):
+    def func(self, *args):
+        return getattr(self.data, name)(*_unwrap(args))
+    func.__name__ = name
+    return func
+
+
+for _op in ["add", "sub", "mul", "truediv", "floordiv", "mod", "pow",
+            "and", "or", "xor", "lshift", "rshift", "matmul"]:
+    for _name in [f"__{_op}__", f"__r{_op}__"]:
+        setattr(YTreeRootField, _name, _delegate(_name))
+for _name in ["__lt__", "__le__", "__eq__", "__ne__", "__gt__", "__ge__",
+              "__neg__", "__pos__", "__abs__", "__invert__",
+              "__bool__", "__float__", "__int__", "__index__"]:
+    setattr(YTreeRootField, _name, _delegate(_name))
+del _op, _name
+
 class YTreeRootFieldIO(DefaultRootFieldIO):
-    def _read_fields(self, storage_object, fields, dtypes=None):
+    """
+    Root fields are returned as YTreeRootField objects, which only
+    read data from disk when needed.
+    """
+
+    def get_fields(self, data_object, fields=None, **kwargs):
+        if fields:
+            # Derived fields are made from fully loaded arrays, so
+            # read all of their dependencies now.
+            fi = self.arbor.field_info
+            fcache = self._determine_field_storage(data_object).field_data
+            fields_to_generate = fi.resolve_field_dependencies(fields)[1]
+            deps = set()
+            for field in fields_to_generate:
+                if fi[field].get("type") == "derived":
+                    deps.update(fi[field]["dependencies"])
+            eager_fields = set().union(
+                *fi.resolve_field_dependencies(list(deps)))
+            for field in eager_fields.intersection(fcache):
+                if isinstance(fcache[field], YTreeRootField):
+                    fcache[field] = fcache[field].data
+            kwargs["eager_fields"] = eager_fields
+
+        return super().get_fields(data_object, fields=fields, **kwargs)
+
+    def _read_fields(self, storage_object, fields, dtypes=None,
+                     eager_fields=()):
         if dtypes is None:
             dtypes = {}
 
-        fh = h5py.File(self.arbor.filename, mode="r")
-        if self.arbor.analysis_filename is not None:
-            analysis_fh = h5py.File(self.arbor.analysis_filename, mode="r")
-
         field_data = {}
         fi = self.arbor.field_info
         for field in fields:
             if fi[field].get("type") == "analysis_saved":
-                my_fh = analysis_fh
+                filename = self.arbor.analysis_filename
             else:
-                my_fh = fh
-            data = my_fh[f"data/{field}"][()]
-            dtype = dtypes.get(field)
-            if dtype is not None:
-                data = data.astype(dtype)
+                filename = self.arbor.filename
+            data = YTreeRootField(
+                self.arbor, filename, field, dtype=dtypes.get(field))
+            if field in eager_fields:
+                data = data.data
             field_data[field] = data
 
-        self._apply_units(fields, field_data)
-
-        fh.close()
-        if self.arbor.analysis_filename is not None:
-            analysis_fh.close()
-
         return field_data
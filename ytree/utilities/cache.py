@@ -0,0 +1,257 @@
+"""
+on-disk cache utilities
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) ytree development team. All rights reserved.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import hashlib
+import numpy as np
+import os
+import tempfile
+import zipfile
+
+from ytree.config import \
+    ytreecfg
+from ytree.utilities.io import \
+    ensure_dir
+from ytree.utilities.logger import \
+    ytreeLogger as mylog
+
+def get_cache_dir():
+    """
+    Get the directory where cache files are written.
+
+    This is the YTREE_CACHE_DIR environment variable, if set,
+    then the cache_dir config option, then $XDG_CACHE_HOME/ytree
+    or ~/.cache/ytree.
+    """
+
+    if "YTREE_CACHE_DIR" in os.environ:
+        return os.environ["YTREE_CACHE_DIR"]
+    default = os.path.join(
+        os.environ.get("XDG_CACHE_HOME",
+                       os.path.join(os.path.expanduser("~"), ".cache")),
+        "ytree")
+    return ytreecfg["ytree"].get("cache_dir", default)
+
+def cache_enabled(option):
+    """
+    Check whether a cache has been turned on in the config file.
+    """
+
+    try:
+        return ytreecfg["ytree"].getboolean(option, fallback=False)
+    except ValueError:
+        mylog.warning(f"Cannot parse config option {option}, "
+                      "treating it as False.")
+        return False
+
+def get_cache_filename(prefix, *keys):
+    """
+    Get a cache filename unique to a set of keys.
+    """
+
+    key = "\n".join([str(k) for k in keys])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(get_cache_dir(), f"{prefix}_{digest}.npz")
+
+def get_file_signature(filenames):
+    """
+    Get the sizes and modification times of a list of files.
+
+    Missing files are given a size and time of -1 so that
+    they invalidate caches when they appear.
+    """
+
+    sizes = np.empty(len(filenames), dtype=np.int64)
+    mtimes = np.empty(len(filenames), dtype=np.int64)
+    for i, fn in enumerate(filenames):
+        try:
+            st = os.stat(fn)
+        except OSError:
+            sizes[i] = mtimes[i] = -1
+            continue
+        sizes[i] = st.st_size
+        mtimes[i] = st.st_mtime_ns
+    return {"filenames": np.array([os.path.abspath(fn) for fn in filenames]),
+            "sizes": sizes, "mtimes": mtimes}
+
+def load_cache_file(filename, signature):
+    """
+    Load arrays from a cache file.
+
+    Returns None if the file does not exist, cannot be read, or
+    was made from files that have since changed.
+    """
+
+    if not os.path.exists(filename):
+        return None
+
+    try:
+        with np.load(filename, allow_pickle=False) as f:
+            data = dict((key, f[key]) for key in f.files)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        mylog.warning(f"Ignoring unreadable cache file: {filename}.")
+        return None
+
+    for key, val in signature.items():
+        cval = data.pop(f"signature_{key}", None)
+        if cval is None or cval.shape != val.shape or \
+          (cval != val).any():
+            return None
+    return data
+
+def _write_file(filename, write):
+    """
+    Write a file with a given function, safely.
+
+    The file is written to a temporary file in the same directory
+    and then moved into place, so readers only ever see a complete
+    file, even with multiple processes writing at once. Failure to
+    write is not fatal.
+    """
+
+    dirname = os.path.dirname(filename)
+    try:
+        ensure_dir(dirname)
+        fd, tmpfn = tempfile.mkstemp(
+            dir=dirname, prefix=".tmp_",
+            suffix=os.path.splitext(filename)[1])
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmpfn, filename)
+        except BaseException:
+            os.remove(tmpfn)
+            raise
+    except OSError as e:
+        mylog.warning(f"Could not write cache file {filename}: {e}.")
+
+def save_cache_file(filename, signature, data):
+    """
+    Save arrays to a cache file.
+    """
+
+    save_data = data.copy()
+    for key, val in signature.items():
+        save_data[f"signature_{key}"] = val
+
+    _write_file(filename, lambda f: np.savez(f, **save_data))
+
+def get_column_cache(filename):
+    """
+    Get the column cache for a text file if the column_cache
+    config option is on. Otherwise, return None.
+    """
+
+    if not cache_enabled("column_cache"):
+        return None
+    return ColumnCache(filename)
+
+class ColumnCache:
+    """
+    Binary copies of columns of data from a text file.
+
+    Each array is stored as an npy file in a directory whose name
+    depends on the path, size, and modification time of the text
+    file, so a changed file gets a new cache. Arrays are returned
+    memory-mapped.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        signature = get_file_signature([filename])
+        digest = hashlib.sha1(
+            "\n".join([str(val[0]) for val in signature.values()])
+            .encode("utf-8")).hexdigest()
+        self.directory = os.path.join(get_cache_dir(), f"columns_{digest}")
+        self._pending = {}
+
+    def __repr__(self):
+        return self.directory
+
+    @staticmethod
+    def column_name(column, dtype):
+        """
+        Get the name used to store a column with a given data type.
+        """
+        return f"column_{column}_{np.dtype(dtype).name}"
+
+    def _get_filename(self, name):
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def get(self, name):
+        """
+        Get a stored array or None if it is not there.
+        """
+
+        filename = self._get_filename(name)
+        if not os.path.exists(filename):
+            return None
+        try:
+            return np.load(filename, mmap_mode="r")
+        except ValueError:
+            # empty arrays cannot be memory-mapped
+            pass
+        try:
+            return np.load(filename)
+        except (OSError, ValueError):
+            mylog.warning(f"Ignoring unreadable cache file: {filename}.")
+            return None
+
+    def save(self, name, data):
+        """
+        Store an array.
+        """
+
+        _write_file(self._get_filename(name),
+                    lambda f: np.save(f, data))
+
+    def create(self, name, size, dtype):
+        """
+        Create a memory-mapped array to be filled and then stored
+        with commit. Returns None if the file cannot be created.
+        """
+
+        try:
+            ensure_dir(self.directory)
+            fd, tmpfn = tempfile.mkstemp(
+                dir=self.directory, prefix=".tmp_", suffix=".npy")
+            os.close(fd)
+            data = np.lib.format.open_memmap(
+                tmpfn, mode="w+", dtype=dtype, shape=(int(size),))
+        except (OSError, ValueError) as e:
+            mylog.warning(f"Could not create cache file for {name}: {e}.")
+            return None
+        self._pending[name] = tmpfn
+        return data
+
+    def commit(self, name, data):
+        """
+        Store an array made with create.
+        """
+
+        tmpfn = self._pending.pop(name)
+        try:
+            data.flush()
+            os.replace(tmpfn, self._get_filename(name))
+        except OSError as e:
+            mylog.warning(f"Could not write cache file for {name}: {e}.")
+
+    def discard(self, name):
+        """
+        Remove an array made with create without storing it.
+        """
+
+        tmpfn = self._pending.pop(name)
+        if os.path.exists(tmpfn):
+            os.remove(tmpfn)
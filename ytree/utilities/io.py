@@ -14,6 +14,8 @@ io utilities
 #-----------------------------------------------------------------------------
 
 import errno
+import io
+import mmap
 import numpy as np
 import os
 from unyt import \
@@ -96,6 +98,116 @@ def _hdf5_yt_array_lite(fh, field):
     if units == "dimensionless": units = ""
     return (fh[field][()], units)
 
+def read_text_ranges(filename, starts, ends):
+    """
+    Read many byte ranges from a file and join them into one string.
+
+    The file is memory-mapped and all ranges are gathered with a
+    single fancy index rather than a seek and read for each.
+    """
+
+    lengths = ends - starts
+    total = lengths.sum()
+    if total == 0:
+        return ""
+
+    # position in the file of each byte to be read
+    positions = np.arange(total) + \
+      np.repeat(starts - (lengths.cumsum() - lengths), lengths)
+
+    with open(filename, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        data = np.frombuffer(mm, dtype=np.uint8)
+        buff = data[positions]
+    finally:
+        # views of the map must be gone before it can be closed
+        data = None
+        mm.close()
+
+    return buff.tobytes().decode()
+
+def read_hdf5_rows(ds, indices, max_gap=4096, max_rows=262144):
+    """
+    Read the rows of a dataset at an array of indices.
+
+    Sorted indices are grouped into ranges that are each read at
+    once. Indices closer together than max_gap, or the chunk size of
+    the dataset if larger, share a range. Ranges span at most
+    max_rows rows.
+    """
+
+    uind, inverse = np.unique(indices, return_inverse=True)
+    data = np.empty((uind.size,) + ds.shape[1:], dtype=ds.dtype)
+    if uind.size == 0:
+        return data
+
+    if ds.chunks is not None:
+        max_gap = max(max_gap, ds.chunks[0])
+    breaks = np.where((np.diff(uind) > max_gap) |
+                      (np.diff(uind // max_rows) > 0))[0] + 1
+    starts = np.concatenate([[0], breaks])
+    ends = np.concatenate([breaks, [uind.size]])
+    for start, end in zip(starts, ends):
+        si = uind[start]
+        ei = uind[end-1] + 1
+        if ei - si == end - start:
+            data[start:end] = ds[si:ei]
+        else:
+            data[start:end] = ds[si:ei][uind[start:end] - si]
+    return data[inverse]
+
+def parse_text_columns(text, fields, columns, dtypes):
+    """
+    Parse whitespace-separated columns of text into arrays.
+
+    All lines are parsed in a single call to np.loadtxt, reading
+    only the columns needed. Blank lines and lines beginning with
+    "#" are skipped.
+
+    Parameters
+    ----------
+    text : string or iterable of strings
+        The text to be parsed or an iterable of lines.
+    fields : list of strings
+        The fields to get.
+    columns : dict
+        The column number of each field.
+    dtypes : dict
+        The data type of each field.
+
+    Returns
+    -------
+    field_data : dict
+        A dict of arrays for each field.
+    """
+
+    if not fields:
+        return {}
+
+    # Read each column once. If a column is requested with
+    # different data types, read it as a float.
+    col_dtypes = {}
+    for field in fields:
+        col = columns[field]
+        dtype = np.dtype(dtypes[field])
+        if col_dtypes.get(col, dtype) != dtype:
+            dtype = np.dtype(np.float64)
+        col_dtypes[col] = dtype
+    usecols = sorted(col_dtypes)
+
+    if isinstance(text, str):
+        if not text.strip():
+            return dict((field, np.empty(0, dtype=dtypes[field]))
+                        for field in fields)
+        text = io.StringIO(text)
+    data = np.loadtxt(
+        text, comments="#", ndmin=1, usecols=usecols,
+        dtype=[(f"c{col}", col_dtypes[col]) for col in usecols])
+
+    return dict((field, data[f"c{columns[field]}"].astype(dtypes[field]))
+                for field in fields)
+
 def f_text_block(f, block_size=4096, file_size=None, sep="\n",
                  pbar_string=None):
     """
@@ -13,6 +13,8 @@ testing utilities
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+from contextlib import contextmanager
+import glob
 import h5py
 import numpy as np
 from numpy.testing import \
@@ -26,10 +28,11 @@ import subprocess
 import sys
 import tempfile
 from unittest import \
-    skipIf, TestCase
+    mock, skipIf, TestCase
 from yt.funcs import \
     get_pbar
 
+from ytree.config import ytreecfg
 from ytree.data_structures.load import load
 from ytree.frontends.ytree import YTreeArbor
 from ytree.utilities.io import dirname
@@ -229,6 +232,20 @@ class ArborTest:
         node_list = list(my_tree["forest"])
         assert_equal(my_halo.uid, node_list[0].uid)
 
+    def test_tree_topology(self):
+        for my_tree in get_random_trees(self.arbor, 32186, 5):
+            verify_tree_topology(my_tree)
+
+    def test_batch_selector(self):
+        for my_tree in get_random_trees(self.arbor, 56382, 5):
+            verify_batch_selector(my_tree)
+
+    def test_plant_cache(self):
+        verify_plant_cache(self.arbor, self.load_kwargs)
+
+    def test_column_cache(self):
+        verify_column_cache(self.arbor, self.load_kwargs)
+
     def test_reset_node(self):
         t = self.arbor[0]
         ts0 = len(list(t['tree']))
@@ -471,6 +488,171 @@ def verify_get_node(my_tree, n=3):
                   f"{str(my_tree.arbor)}."
                 assert_equal(my_node.tree_id, inode, err_msg=err_msg)
 
+def verify_tree_topology(my_tree):
+    """
+    Unit tests for ancestor/descendent structure.
+    """
+
+    uids = my_tree["forest", "uid"]
+    desc_uids = my_tree["forest", "desc_uid"]
+    for my_node in my_tree["forest"]:
+        err_msg = f"Tree topology failure for {my_node} in {my_tree.arbor}."
+        assert_equal(uids[my_node.tree_id], my_node.uid, err_msg=err_msg)
+
+        desc = my_node.descendent
+        if desc is None:
+            assert desc_uids[my_node.tree_id] not in uids, err_msg
+        else:
+            assert_equal(desc.uid, desc_uids[my_node.tree_id], err_msg=err_msg)
+
+        ancestors = list(my_node.ancestors)
+        anc_uids = np.sort([anc.uid for anc in ancestors])
+        assert_array_equal(
+            anc_uids, np.sort(uids[desc_uids == my_node.uid]), err_msg=err_msg)
+
+        # the tree beneath is this node followed by each ancestor's tree
+        tree_uids = [[my_node.uid]] + \
+          [anc["tree", "uid"] for anc in ancestors]
+        assert_array_equal(
+            my_node["tree", "uid"], np.concatenate(tree_uids), err_msg=err_msg)
+
+def verify_batch_selector(my_tree):
+    """
+    Unit tests for selecting all progenitors at once.
+    """
+
+    selector = my_tree.arbor.selector
+    for my_node in my_tree["tree"]:
+        ancestors = list(my_node.ancestors)
+        prog = list(my_node["prog"])
+        if not ancestors:
+            assert_equal(len(prog), 1)
+            continue
+
+        my_anc = selector.function(ancestors, *selector.args, **selector.kwargs)
+        err_msg = f"Batch selector failure for {my_node} in {my_tree.arbor}."
+        assert_equal(prog[1].uid, my_anc.uid, err_msg=err_msg)
+        assert_array_equal(
+            my_node["prog", "uid"], [node.uid for node in prog], err_msg=err_msg)
+
+@contextmanager
+def enable_cache(option):
+    """
+    Turn on a cache config option, using a temporary cache directory.
+    """
+
+    config = ytreecfg["ytree"]
+    old_config = dict((opt, config.get(opt))
+                      for opt in [option, "cache_dir"])
+    cache_dir = tempfile.mkdtemp()
+    config[option] = "True"
+    config["cache_dir"] = cache_dir
+
+    try:
+        yield cache_dir
+    finally:
+        for opt, val in old_config.items():
+            if val is None:
+                config.pop(opt)
+            else:
+                config[opt] = val
+        shutil.rmtree(cache_dir)
+
+def verify_plant_cache(arbor, load_kwargs=None):
+    """
+    Check that arbors planted from the on-disk cache match the original.
+    """
+
+    if load_kwargs is None:
+        load_kwargs = {}
+
+    def plant_trees(a, planted=True):
+        # Plant, recording what _load_plant_cache returned. If
+        # planted is False, fail if trees are not loaded from the cache.
+        results = []
+        load_plant_cache = a._load_plant_cache
+
+        def _load_plant_cache():
+            results.append(load_plant_cache())
+            return results[-1]
+
+        def fail():
+            raise AssertionError(
+                f"Trees planted without using the cache for {arbor}.")
+
+        with mock.patch.object(a, "_load_plant_cache",
+                               side_effect=_load_plant_cache):
+            if planted:
+                a._plant_trees()
+            else:
+                with mock.patch.object(a, "_initialize_node_info",
+                                       side_effect=fail), \
+                     mock.patch.object(a, "_save_plant_cache",
+                                       side_effect=fail):
+                    a._plant_trees()
+        return results
+
+    with enable_cache("plant_cache") as cache_dir:
+        a1 = load(arbor.filename, **load_kwargs)
+        results = plant_trees(a1)
+        # this frontend does not use the plant cache
+        if not results:
+            return
+        assert_equal(results, [False])
+        cache_files = glob.glob(os.path.join(cache_dir, "plant_*.npz"))
+        assert_equal(len(cache_files), 1,
+                     err_msg=f"Plant cache file not written for {arbor}.")
+
+        a2 = load(arbor.filename, **load_kwargs)
+        results = plant_trees(a2, planted=False)
+        assert_equal(results, [True])
+
+    assert_equal(a2.size, a1.size)
+    for attr, val in a1._node_info.items():
+        if val.dtype == object:
+            continue
+        assert_array_equal(
+            a2._node_info[attr], val,
+            err_msg=f"Cached {attr} does not match for {arbor}.")
+
+    assert_array_equal(a2["uid"], arbor["uid"])
+    for my_tree in get_random_trees(a2, 18422, 5):
+        my_tree0 = arbor[my_tree._arbor_index]
+        assert_array_equal(my_tree["tree", "uid"], my_tree0["tree", "uid"])
+
+def verify_column_cache(arbor, load_kwargs=None):
+    """
+    Check that fields read through the column cache match the original,
+    both when the cache is made and when it is reused.
+    """
+
+    if load_kwargs is None:
+        load_kwargs = {}
+
+    # fields read from text columns, if any
+    text_fields = [field for field in arbor.field_list
+                   if "column" in arbor.field_info[field]][:3]
+    fields = ["uid", "desc_uid"] + text_fields
+    with enable_cache("column_cache") as cache_dir:
+        for i in range(2):
+            a = load(arbor.filename, **load_kwargs)
+            for field in fields:
+                assert_array_equal(
+                    a[field], arbor[field],
+                    err_msg=f"Cached {field} does not match for {arbor}.")
+            for my_tree in get_random_trees(a, 60213, 5):
+                my_tree0 = arbor[my_tree._arbor_index]
+                for field in fields:
+                    assert_array_equal(
+                        my_tree["tree", field], my_tree0["tree", field],
+                        err_msg=f"Cached {field} does not match for {arbor}.")
+
+            cache_files = glob.glob(
+                os.path.join(cache_dir, "columns_*", "*.npy"))
+            assert_equal(
+                bool(cache_files), bool(text_fields),
+                err_msg=f"Column cache files not as expected for {arbor}.")
+
 def verify_get_leaf_nodes(my_tree):
     """
     Unit tests for get_leaf_nodes.